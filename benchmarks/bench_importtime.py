@@ -0,0 +1,86 @@
+# bench_importtime.py
+"""
+    Measures the cold-start cost of main.py with python -X importtime, for the paths a run can take.
+
+    "cli" is what --help and the profile menus pay: importing main.py. "sync" adds the modules a sync imports.
+    For each path it prints the median import time and wall-clock time of a fresh interpreter over several runs,
+    and the slowest imports of the last run. It fails if a dependency that only syncing needs is imported by main.py.
+
+    Run from the repository root: python -m benchmarks.bench_importtime
+    No network access or real credentials are needed.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATHS = {
+    'cli': 'import main',
+    'sync': 'import main\nimport src.SyncRunner',
+}
+# Packages that only syncing needs, and that must not be imported just to start main.py
+SYNC_ONLY_PACKAGES = ('googleapiclient', 'google', 'google_auth_oauthlib', 'oauthlib', 'httplib2', 'requests',
+                      'icalendar', 'pytz', 'dateutil', 'asyncio')
+
+
+def parse_importtime(stderr):
+    """Return {module: (self µs, cumulative µs, depth)} from -X importtime output."""
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return imports
+
+
+def run_path(code):
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=REPOSITORY_ROOT,
+                               capture_output=True, text=True, check=True)
+    seconds = time.perf_counter() - started
+    return seconds, parse_importtime(completed.stderr)
+
+
+def measure(code, repeat):
+    # The first run may have to write .pyc files, so it isn't counted
+    run_path(code)
+    runs = [run_path(code) for _ in range(repeat)]
+    wall_ms = statistics.median(seconds for seconds, _ in runs) * 1000
+    # Top-level imports' cumulative times add up to the whole import time
+    import_ms = statistics.median(sum(cumulative for _, cumulative, depth in imports.values() if depth == 0)
+                                  for _, imports in runs) / 1000
+    return wall_ms, import_ms, runs[-1][1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the startup imports of main.py.")
+    parser.add_argument('--repeat', type=int, default=10, help='Fresh interpreters to start per path.')
+    parser.add_argument('--top', type=int, default=10, help='Number of slowest imports to list per path.')
+    args = parser.parse_args()
+
+    baseline_ms, _, _ = measure('pass', args.repeat)
+    print(f"{'python -c pass':<16} {baseline_ms:8.1f} ms wall")
+    leaked = []
+    for path, code in PATHS.items():
+        wall_ms, import_ms, imports = measure(code, args.repeat)
+        print(f"{path:<16} {wall_ms:8.1f} ms wall {import_ms:8.1f} ms importing {len(imports):5d} modules")
+        slowest = sorted(((cumulative, name) for name, (_, cumulative, depth) in imports.items() if depth <= 1),
+                         reverse=True)[:args.top]
+        for cumulative, name in slowest:
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+        if path == 'cli':
+            leaked = sorted({name.split('.')[0] for name in imports} & set(SYNC_ONLY_PACKAGES))
+
+    if leaked:
+        print(f"main.py imports modules only syncing needs: {', '.join(leaked)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
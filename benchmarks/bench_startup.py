@@ -0,0 +1,54 @@
+# bench_startup.py
+"""
+    Measures how long it takes to get a Calendar service, as every CalendarManager does at startup.
+
+    Run from the repository root: python -m benchmarks.bench_startup
+    No network access or real credentials are needed.
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from google.auth.credentials import AnonymousCredentials
+from googleapiclient.discovery import build
+from src.get_calendar_service import get_calendar_service
+
+
+def time_per_call(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Calendar service construction.")
+    parser.add_argument('--repeat', type=int, default=50, help='Number of services to build per measurement.')
+    args = parser.parse_args()
+
+    creds = AnonymousCredentials()
+    started = time.perf_counter()
+    get_calendar_service(creds)
+    first = time.perf_counter() - started
+
+    # build() looks up and parses the discovery document every time
+    rebuilt = time_per_call(lambda: build('calendar', 'v3', credentials=creds), args.repeat)
+    cached = time_per_call(lambda: get_calendar_service(creds), args.repeat)
+
+    # A fresh interpreter pays for the imports too, like a cron-driven main.py --config run
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c',
+                    'from google.auth.credentials import AnonymousCredentials\n'
+                    'from src.get_calendar_service import get_calendar_service\n'
+                    'get_calendar_service(AnonymousCredentials())'], check=True)
+    cold = time.perf_counter() - started
+
+    print(f"build() per call:                     {rebuilt * 1000:8.3f} ms")
+    print(f"First get_calendar_service():         {first * 1000:8.3f} ms")
+    print(f"Cached get_calendar_service():        {cached * 1000:8.3f} ms")
+    print(f"Cold process start + service:         {cold * 1000:8.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+# bench_sync.py
+"""
+    Measures full syncs of synthetic TimeEdit feeds against a local fake Google Calendar.
+
+    Every feed size is synced three times into an empty calendar: the first sync creates every event,
+    the second (forced) finds nothing to do and the third picks up a change to every tenth event.
+    Throughput, API calls and peak memory are printed and appended to benchmarks/results/bench_sync.jsonl,
+    and each result is compared with the last stored run with the same settings.
+
+    Run from the repository root: python -m benchmarks.bench_sync --events 100 1000 10000
+    No network access or real credentials are needed.
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+from benchmarks.fake_calendar import build_service, serve_in_process
+from src.configure_logging import configure_logging
+from src.SyncRunner import SyncRunner
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'bench_sync.jsonl')
+PHASES = ('initial', 'unchanged', 'changed')
+# Settings that must match for two runs to be compared
+COMPARED_SETTINGS = ('swedish', 'latency', 'rate_limit', 'error_rate', 'batch_size', 'api_rate', 'stream',
+                     'incremental', 'no_prefetch', 'concurrency')
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def fetch_stats(url):
+    with urllib.request.urlopen(f"{url}_stats") as response:
+        return json.load(response)
+
+
+def count_delta(after, before):
+    return {method: after[method] - before.get(method, 0)
+            for method in sorted(after) if after[method] != before.get(method, 0)}
+
+
+def run_phase(runner, config, service, url, trace_memory):
+    before = fetch_stats(url)
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    result = runner.sync_profile(config, service)
+    seconds = time.perf_counter() - started
+    measured = {'seconds': round(seconds, 3), 'status': result['status'], 'plan': result['plan'],
+                'api_calls': count_delta(fetch_stats(url), before), 'peak_rss_mb': peak_rss_mb()}
+    if trace_memory:
+        measured['peak_traced_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        tracemalloc.stop()
+    return measured
+
+
+def benchmark(events, args, url, service):
+    runner_options = {'batch_size': args.batch_size, 'stream': args.stream, 'incremental': args.incremental,
+                      'prefetch': not args.no_prefetch, 'concurrency': args.concurrency,
+                      'service_factory': lambda: build_service(url)}
+    config = {
+        'config_name': f'benchmark-{events}',
+        'calendar_id': f'benchmark-{events}@example.com',
+        'ical_url': f"{url}feed.ics?events={events}&swedish={int(args.swedish)}&revision=0",
+        'time_zone': 'UTC',
+        'excluded_colors': '',
+        'api_rate': str(args.api_rate),
+        'api_burst': str(max(1, int(args.api_rate))),
+    }
+    phases = {}
+    for phase in PHASES:
+        if phase == 'changed':
+            config['ical_url'] = config['ical_url'].replace('revision=0', 'revision=1')
+        runner = SyncRunner(force=phase == 'unchanged', **runner_options)
+        measured = run_phase(runner, config, service, url, args.trace_memory)
+        measured['events_per_second'] = round(events / measured['seconds'], 1) if measured['seconds'] else None
+        phases[phase] = measured
+    return phases
+
+
+def previous_result(settings, events):
+    """Return the last stored result with the same settings and feed size, if there is one."""
+    previous = None
+    try:
+        with open(RESULTS_PATH, 'r', encoding='utf-8') as results_file:
+            for line in results_file:
+                record = json.loads(line)
+                # Settings added later default to off in older records
+                if (record['events'] == events
+                        and all(record['settings'].get(key, settings[key] if not settings[key] else None) == settings[key]
+                                for key in COMPARED_SETTINGS)):
+                    previous = record
+    except (OSError, ValueError, KeyError):
+        pass
+    return previous
+
+
+def print_result(events, phases, previous):
+    print(f"{events} events:")
+    for phase, measured in phases.items():
+        line = (f"  {phase:<10} {measured['seconds']:9.3f} s {measured['events_per_second'] or 0:10.1f} events/s"
+                f"  {sum(measured['api_calls'].values()):6d} API calls")
+        if measured['peak_rss_mb'] is not None:
+            line += f"  {measured['peak_rss_mb']:7.1f} MB peak RSS"
+        if 'peak_traced_mb' in measured:
+            line += f"  {measured['peak_traced_mb']:7.1f} MB traced"
+        if previous and phase in previous['phases'] and previous['phases'][phase]['seconds']:
+            change = measured['seconds'] / previous['phases'][phase]['seconds'] - 1
+            line += f"  ({change:+.0%} vs {previous['commit'] or previous['timestamp']})"
+        print(line)
+        print(f"  {'':<10} {measured['plan']}; {measured['api_calls']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark full syncs against a fake Google Calendar.")
+    parser.add_argument('--events', type=int, nargs='+', default=[100, 1000, 10000],
+                        help='Feed sizes to sync, e.g. --events 100 1000 100000.')
+    parser.add_argument('--swedish', action='store_true', help="Use 'Kursnamn' instead of 'Course name'.")
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds the fake API adds to every call.')
+    parser.add_argument('--rate-limit', type=float, help='Calls per second the fake API allows before rateLimitExceeded.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of fake API calls that fail with a 503.')
+    parser.add_argument('--batch-size', type=int, default=50, help='Writes per batch request (0 disables batching).')
+    parser.add_argument('--api-rate', type=float, default=1000.0,
+                        help="The profile's api_rate. The default keeps the client from limiting itself.")
+    parser.add_argument('--stream', action='store_true', help='Sync with --stream.')
+    parser.add_argument('--incremental', action='store_true', help='Sync with --incremental.')
+    parser.add_argument('--no-prefetch', action='store_true', help='Sync with --no-prefetch.')
+    parser.add_argument('--concurrency', type=int, default=0, help='Sync with --concurrency.')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Also measure the peak Python heap per sync with tracemalloc (which slows it down).')
+    parser.add_argument('--no-save', action='store_true', help="Don't store the results.")
+    args = parser.parse_args()
+
+    configure_logging(logging.WARNING)
+    # The fake server runs in its own process, so it doesn't compete with the sync for the GIL or memory
+    connection, child_connection = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve_in_process, daemon=True,
+                                     args=(child_connection, args.latency, args.rate_limit, args.error_rate))
+    server.start()
+    url = connection.recv()
+    service = build_service(url)
+
+    settings = {key: getattr(args, key) for key in COMPARED_SETTINGS}
+    # The benchmark's sync state, caches and color tables are kept out of config/ and removed afterwards
+    working_directory = os.getcwd()
+    records = []
+    with tempfile.TemporaryDirectory(prefix='timeeditarc-bench-') as scratch:
+        os.chdir(scratch)
+        try:
+            for events in sorted(args.events):
+                phases = benchmark(events, args, url, service)
+                print_result(events, phases, previous_result(settings, events))
+                records.append({
+                    'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+                    'commit': git_commit(),
+                    'python': platform.python_version(),
+                    'events': events,
+                    'settings': settings,
+                    'phases': phases,
+                })
+        finally:
+            connection.close()
+            server.join(timeout=5)
+            os.chdir(working_directory)
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+        with open(RESULTS_PATH, 'a', encoding='utf-8') as results_file:
+            for record in records:
+                results_file.write(json.dumps(record) + '\n')
+        print(f"Results appended to {RESULTS_PATH}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# bench_transform.py
+"""
+    Measures the per-event cost of parsing and transforming a synthetic TimeEdit feed the way a sync does,
+    streamed and not, and of loading it from the parse cache instead.
+
+    Run from the repository root: python -m benchmarks.bench_transform --events 50000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from benchmarks.feedgen import generate_feed
+from src.ICalManager import ICalManager
+from src.ParseCache import ParseCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the iCal event transform.")
+    parser.add_argument('--events', type=int, default=50000, help='Number of events in the synthetic feed.')
+    parser.add_argument('--swedish', action='store_true', help="Use 'Kursnamn' instead of 'Course name'.")
+    args = parser.parse_args()
+
+    feed = generate_feed(args.events, swedish=args.swedish)
+    config = {'config_name': 'benchmark', 'calendar_id': 'benchmark@example.com', 'excluded_colors': '8'}
+    # The color table and the caches go to a scratch directory instead of config/
+    os.chdir(tempfile.mkdtemp(prefix='timeeditarc-bench-'))
+
+    # The feed is passed in, so this never touches the network
+    ical_manager = ICalManager(config, parse_cache=False)
+    started = time.perf_counter()
+    events = len(ical_manager.feed_records(feed))
+    transformed = time.perf_counter()
+    timings = ical_manager.metrics.timings
+
+    streamed_events = 0
+    ical_manager = ICalManager(config)
+    for _ in ical_manager.iter_transformed_events([feed.split('\r\n')]):
+        streamed_events += 1
+    streamed = time.perf_counter()
+
+    # The first call parses the feed and stores its records, the second loads them
+    ical_manager = ICalManager(config)
+    ical_manager.parse_cache = ParseCache(tempfile.mkdtemp(prefix='timeeditarc-parsed-'))
+    ical_manager.feed_records(feed)
+    stored = time.perf_counter()
+    ical_manager.feed_records(feed)
+    loaded = time.perf_counter()
+
+    print(f"Events:                      {events}")
+    print(f"Parse:                       {timings['parse'] / events * 1e6:8.2f} us/event")
+    print(f"Transform:                   {timings['transform'] / events * 1e6:8.2f} us/event")
+    print(f"Parse + transform:           {(transformed - started) / events * 1e6:8.2f} us/event")
+    print(f"Streaming parse + transform: {(streamed - transformed) / streamed_events * 1e6:8.2f} us/event")
+    print(f"Parse, transform and store:  {(stored - streamed) / events * 1e6:8.2f} us/event")
+    print(f"Parse cache hit:             {(loaded - stored) / events * 1e6:8.2f} us/event")
+    if streamed_events != events:
+        print(f"Warning: the streaming parser found {streamed_events} events")
+
+
+if __name__ == '__main__':
+    main()
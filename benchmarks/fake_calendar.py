@@ -0,0 +1,372 @@
+# fake_calendar.py
+"""
+    A local, stateful stand-in for the Google Calendar v3 events API and a TimeEdit feed, for benchmarks.
+
+    Supports events list (timeMin, timeMax, q, privateExtendedProperty, syncToken, paging, and singleEvents,
+    which expands recurring events), get, insert, update, patch, delete and batch requests, with configurable
+    latency, rate limiting and error injection.
+    Synthetic feeds are served from /feed.ics?events=N&swedish=1&revision=R with an ETag, and call counts
+    from /_stats.
+
+    Run on its own with: python -m benchmarks.fake_calendar --port 8080
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+import httplib2
+import pytz
+from dateutil.parser import parse
+from dateutil.rrule import rrulestr
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from benchmarks.feedgen import generate_feed
+
+EVENTS_PATH = re.compile(r'^/calendar/v3/calendars/([^/]+)/events(?:/([^/]+))?$')
+# How far ahead recurring events without an end are expanded
+RECURRENCE_HORIZON = datetime.timedelta(days=2 * 365)
+
+
+def instant(event_time):
+    """Return a Calendar API start/end object as a UTC datetime."""
+    if 'dateTime' not in event_time:
+        return pytz.utc.localize(parse(event_time['date']))
+    dt = parse(event_time['dateTime'])
+    if dt.tzinfo is None:
+        dt = pytz.timezone(event_time.get('timeZone', 'UTC')).localize(dt)
+    return dt.astimezone(pytz.utc)
+
+
+def expand_recurring(event):
+    """Return the occurrences of a recurring event, as a list with singleEvents=true returns them."""
+    zone = pytz.timezone(event['start'].get('timeZone', 'UTC'))
+    start = parse(event['start']['dateTime']).replace(tzinfo=None)
+    duration = parse(event['end']['dateTime']).replace(tzinfo=None) - start
+    # The rules' dates are wall-clock times in the event's time zone, so their TZID parameters are dropped
+    lines = [line.split(';', 1)[0] + ':' + line.split(':', 1)[1] if line.startswith(('RDATE;', 'EXDATE;')) else line
+             for line in event['recurrence']]
+    rules = rrulestr('\n'.join(lines), dtstart=start, forceset=True)
+    occurrences = []
+    for local_start in rules.between(start, start + RECURRENCE_HORIZON, inc=True):
+        begin, end = zone.localize(local_start), zone.localize(local_start + duration)
+        occurrence = {key: value for key, value in event.items() if key != 'recurrence'}
+        occurrence.update(
+            id=f"{event['id']}_{begin.astimezone(pytz.utc):%Y%m%dT%H%M%SZ}", recurringEventId=event['id'],
+            originalStartTime={'dateTime': begin.isoformat(), 'timeZone': zone.zone},
+            start={'dateTime': begin.isoformat(), 'timeZone': zone.zone},
+            end={'dateTime': end.isoformat(), 'timeZone': zone.zone},
+            _start=begin.astimezone(pytz.utc), _end=end.astimezone(pytz.utc))
+        occurrences.append(occurrence)
+    return occurrences
+
+
+def api_error(status, message, reason=None):
+    error = {'code': status, 'message': message}
+    if reason:
+        error['errors'] = [{'reason': reason, 'message': message}]
+    return {'error': error}
+
+
+class CalendarStore:
+    """Events by calendar, with a change sequence number per event for sync tokens."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calendars = {}
+        self.sequence = 0
+        self.sync_tokens = {}
+        self.calls = {}
+
+    def count(self, method):
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+    def store_event(self, calendar, event):
+        self.sequence += 1
+        event['_sequence'] = self.sequence
+        # Keep the start and end instants so listing doesn't parse them again
+        event['_start'] = instant(event['start'])
+        event['_end'] = instant(event['end'])
+        calendar[event['id']] = event
+        return self.public(event)
+
+    @staticmethod
+    def public(event):
+        return {key: value for key, value in event.items() if not key.startswith('_')}
+
+    def handle(self, method, path, query, body):
+        match = EVENTS_PATH.match(path)
+        if not match:
+            return 404, api_error(404, 'Not Found')
+        calendar_id, event_id = unquote(match.group(1)), match.group(2) and unquote(match.group(2))
+        with self.lock:
+            calendar = self.calendars.setdefault(calendar_id, {})
+            if event_id is None:
+                if method == 'GET':
+                    self.count('list')
+                    return self.list_events(calendar, query)
+                self.count('insert')
+                event = dict(body, id=uuid.uuid4().hex, status='confirmed')
+                return 200, self.store_event(calendar, event)
+
+            event = calendar.get(event_id)
+            if event is None or (event['status'] == 'cancelled' and method != 'GET'):
+                return 404, api_error(404, 'Not Found', 'notFound')
+            if method == 'GET':
+                self.count('get')
+                return 200, self.public(event)
+            if method == 'DELETE':
+                self.count('delete')
+                # Deleted events stay around as cancelled, so sync tokens can report them
+                self.store_event(calendar, dict(event, status='cancelled'))
+                return 204, None
+            self.count('update' if method == 'PUT' else 'patch')
+            updated = dict(body) if method == 'PUT' else dict(self.public(event), **body)
+            updated.update(id=event_id, status='confirmed')
+            return 200, self.store_event(calendar, updated)
+
+    def list_events(self, calendar, query):
+        def get(key):
+            return query.get(key, [None])[0]
+
+        events = sorted(calendar.values(), key=lambda event: event['_sequence'])
+        if get('singleEvents') == 'true':
+            events = [occurrence for event in events
+                      for occurrence in (expand_recurring(event) if event.get('recurrence') else [event])]
+        sync_token = get('syncToken')
+        if sync_token is not None:
+            if sync_token not in self.sync_tokens:
+                return 410, api_error(410, 'Sync token is no longer valid, a full sync is required.', 'fullSyncRequired')
+            events = [event for event in events if event['_sequence'] > self.sync_tokens[sync_token]]
+        else:
+            if get('showDeleted') != 'true':
+                events = [event for event in events if event['status'] != 'cancelled']
+            if get('timeMin'):
+                time_min = parse(get('timeMin'))
+                events = [event for event in events if event['_end'] > time_min]
+            if get('timeMax'):
+                time_max = parse(get('timeMax'))
+                events = [event for event in events if event['_start'] < time_max]
+            if get('q'):
+                terms = get('q').lower().split()
+                events = [event for event in events
+                          if all(term in f"{event.get('summary', '')} {event.get('description', '')}".lower()
+                                 for term in terms)]
+            for prop in query.get('privateExtendedProperty', []):
+                key, _, value = prop.partition('=')
+                events = [event for event in events
+                          if event.get('extendedProperties', {}).get('private', {}).get(key) == value]
+            if get('orderBy') == 'startTime':
+                events.sort(key=lambda event: event['_start'])
+
+        offset = int(get('pageToken') or 0)
+        page_size = min(int(get('maxResults') or 250), 2500)
+        result = {'kind': 'calendar#events', 'items': [self.public(event) for event in events[offset:offset + page_size]]}
+        if offset + page_size < len(events):
+            result['nextPageToken'] = str(offset + page_size)
+        elif sync_token is not None or not any(get(key) for key in ('timeMin', 'timeMax', 'q', 'orderBy',
+                                                                     'privateExtendedProperty')):
+            # Like Google, only unfiltered lists end with a token for the next incremental sync
+            token = uuid.uuid4().hex
+            self.sync_tokens[token] = self.sequence
+            result['nextSyncToken'] = token
+        return 200, result
+
+
+class TokenBucket:
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class FakeCalendarHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def do_PUT(self):
+        self.handle_request('PUT')
+
+    def do_PATCH(self):
+        self.handle_request('PATCH')
+
+    def do_DELETE(self):
+        self.handle_request('DELETE')
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def send(self, status, payload, content_type='application/json', headers=None):
+        if isinstance(payload, bytes):
+            data = payload
+        else:
+            data = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def handle_request(self, method):
+        body = self.read_body()
+        url = urlparse(self.path)
+        if url.path == '/feed.ics':
+            self.send_feed(parse_qs(url.query))
+        elif url.path == '/_stats':
+            self.send(200, self.server.fake.stats())
+        elif url.path.startswith('/batch/'):
+            self.send_batch(body)
+        else:
+            self.send(*self.server.fake.call(method, self.path, body))
+
+    def send_feed(self, query):
+        body, etag = self.server.fake.feed(int(query.get('events', ['100'])[0]),
+                                           query.get('swedish', ['0'])[0] == '1',
+                                           int(query.get('revision', ['0'])[0]))
+        if self.headers.get('If-None-Match') == etag:
+            self.send(304, b'', 'text/calendar', {'ETag': etag})
+        else:
+            self.send(200, body, 'text/calendar; charset=utf-8', {'ETag': etag})
+
+    def send_batch(self, body):
+        self.server.fake.store.count('batch')
+        boundary = self.headers['Content-Type'].split('boundary=')[1].strip('"')
+        responses = []
+        for part in body.split(f'--{boundary}'.encode())[1:-1]:
+            headers, _, request = part.strip(b'\r\n').replace(b'\r\n', b'\n').partition(b'\n\n')
+            content_id = re.search(rb'Content-ID: <(.*?)>', headers).group(1).decode()
+            request_headers, _, request_body = request.partition(b'\n\n')
+            method, path, _ = request_headers.split(b'\n')[0].decode().split(' ')
+            status, payload, extra_headers = self.server.fake.call(method, path, request_body.strip())
+            data = json.dumps(payload) if payload is not None else ''
+            responses.append(f'Content-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n'
+                             f'HTTP/1.1 {status} {self.responses.get(status, ("",))[0]}\r\n'
+                             'Content-Type: application/json\r\n'
+                             + ''.join(f'{name}: {value}\r\n' for name, value in extra_headers.items())
+                             + f'Content-Length: {len(data)}\r\n\r\n{data}\r\n')
+        response_boundary = f'batch_{uuid.uuid4().hex}'
+        data = ''.join(f'--{response_boundary}\r\n{response}' for response in responses) + f'--{response_boundary}--\r\n'
+        self.send(200, data.encode('utf-8'), f'multipart/mixed; boundary={response_boundary}')
+
+
+class FakeCalendarServer:
+    def __init__(self, latency=0.0, rate_limit=None, error_rate=0.0, port=0):
+        # Seconds added to every call, calls per second before rateLimitExceeded, and share of calls failing with 503
+        self.latency = latency
+        self.limiter = TokenBucket(rate_limit) if rate_limit else None
+        self.error_rate = error_rate
+        self.store = CalendarStore()
+        self.feeds = {}
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), FakeCalendarHandler)
+        self.httpd.fake = self
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}/'
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def call(self, method, path, body):
+        """Handle one API call, returning (status, payload, extra headers)."""
+        if self.latency:
+            time.sleep(self.latency)
+        if self.limiter and not self.limiter.take():
+            self.store.count('rate_limited')
+            return 403, api_error(403, 'Rate Limit Exceeded', 'rateLimitExceeded'), {'Retry-After': '1'}
+        if self.error_rate and random.random() < self.error_rate:
+            self.store.count('errors')
+            return 503, api_error(503, 'Backend Error', 'backendError'), {}
+        url = urlparse(path)
+        status, payload = self.store.handle(method, url.path, parse_qs(url.query), json.loads(body) if body else None)
+        return status, payload, {}
+
+    def feed(self, events, swedish, revision):
+        """Return a synthetic feed and its ETag. Each revision moves every tenth event to another room."""
+        key = (events, swedish, revision)
+        if key not in self.feeds:
+            body = generate_feed(events, swedish=swedish)
+            if revision:
+                body = re.sub(r'LOCATION:Room (\d+)\r\nDESCRIPTION:(.*?)ID (\d*0)\r\n',
+                              lambda match: f'LOCATION:Room {match.group(1)}-{revision}\r\n'
+                                            f'DESCRIPTION:{match.group(2)}ID {match.group(3)}\r\n', body)
+            body = body.encode('utf-8')
+            self.feeds[key] = (body, f'"{hashlib.md5(body).hexdigest()}"')
+        return self.feeds[key]
+
+    def stats(self):
+        with self.store.lock:
+            return dict(self.store.calls)
+
+    def build_service(self):
+        return build_service(self.url)
+
+
+def build_service(url):
+    """Return a Calendar service that talks to the fake server at url, without credentials."""
+    document = json.loads(get_static_doc('calendar', 'v3'))
+    document['rootUrl'] = url
+    return build_from_document(document, http=httplib2.Http())
+
+
+def serve_in_process(connection, latency, rate_limit, error_rate):
+    """Run a server until the connection is closed, sending its URL first (for multiprocessing)."""
+    server = FakeCalendarServer(latency, rate_limit, error_rate).start()
+    connection.send(server.url)
+    try:
+        connection.recv()
+    except EOFError:
+        pass
+    server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Google Calendar API and synthetic TimeEdit feeds.")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every API call.')
+    parser.add_argument('--rate-limit', type=float, help='API calls per second before rateLimitExceeded errors.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of API calls that fail with a 503.')
+    args = parser.parse_args()
+
+    server = FakeCalendarServer(args.latency, args.rate_limit, args.error_rate, args.port)
+    print(f"Serving on {server.url} (pid {os.getpid()}), e.g. {server.url}feed.ics?events=1000")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+# feedgen.py
+
+import datetime
+
+ACTIVITIES = ('Lecture', 'Exercise', 'Laboration', 'Seminar')
+
+
+def generate_feed(event_count, swedish=False, start=datetime.datetime(2024, 1, 8, 8, 0), courses=7):
+    """Generate a TimeEdit-style .ics feed with event_count two-hour sessions, four per day."""
+    label = 'Kursnamn' if swedish else 'Course name'
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'METHOD:PUBLISH', 'PRODID:-//TimeEdit AB//TimeEdit//EN']
+    for i in range(event_count):
+        dtstart = start + datetime.timedelta(days=i // 4, hours=2 * (i % 4))
+        dtend = dtstart + datetime.timedelta(hours=2)
+        course = i % courses
+        lines += [
+            'BEGIN:VEVENT',
+            f'DTSTART:{dtstart:%Y%m%dT%H%M%S}Z',
+            f'DTEND:{dtend:%Y%m%dT%H%M%S}Z',
+            f'UID:{i}-synthetic@timeedit.example',
+            'DTSTAMP:20240101T000000Z',
+            f'SUMMARY:DV{1000 + course}. {label}: Course {course}, DV{2000 + course}. {label}: Other course',
+            f'LOCATION:Room {i % 13}',
+            f'DESCRIPTION:Aktivitet: {ACTIVITIES[i % len(ACTIVITIES)]}\\nKursgrupp: Group {i % 3}\\nID {i}',
+            'END:VEVENT',
+        ]
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(lines) + '\r\n'
@@ -16,10 +16,13 @@
 
 import os
 import argparse
-from src.get_calendar_service import logout
-from src.CalendarManager import CalendarManager
+import logging
+from src.configure_logging import configure_logging
 from src.ConfigManager import ConfigManager
-from src.ICalManager import ICalManager
+from src.SyncPlan import SyncPlan
+
+# The sync modules pull in the Google client libraries, requests and icalendar, so they are only imported
+# on the paths that sync. --help and the profile menus start without them
 
 class TimeEditArcApp:
 
@@ -28,24 +31,136 @@ class TimeEditArcApp:
         self.config = None
 
     def run(self):
-        self.load_config_from_args()
+        if self.load_config_from_args():
+            return
         if not self.config:
             self.main_menu()
 
     def load_config_from_args(self):
         parser = argparse.ArgumentParser(description="Manage and update Google Calendar events.")
         parser.add_argument('--config', type=str, help='Name of the configuration to load directly.')
+        parser.add_argument('--configs', type=str, help='Comma-separated names of configurations to sync.')
+        parser.add_argument('--all', action='store_true', help='Sync every configuration.')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Number of configurations to sync at the same time with --configs/--all.')
+        parser.add_argument('--daemon', action='store_true',
+                            help='Keep running and sync the selected configurations (all by default) whenever their feeds change.')
+        parser.add_argument('--interval', type=int, default=900,
+                            help="Seconds between polls in daemon mode, unless a configuration sets poll_interval.")
+        parser.add_argument('--from', dest='sync_from', type=str, metavar='WHEN',
+                            help='Only sync events starting on or after this date: YYYY-MM-DD, today, yesterday, '
+                                 'or a number of days from today such as -7.')
+        parser.add_argument('--to', dest='sync_to', type=str, metavar='WHEN',
+                            help='Only sync events starting on or before this date, e.g. +120.')
+        parser.add_argument('--reconcile', action='store_true',
+                            help='Delete events this tool created that are no longer in the iCal feed.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Work out what a sync would do without changing the calendar.')
+        parser.add_argument('--plan-out', type=str,
+                            help='With --dry-run, write the sync plan as JSON to this file. '
+                                 'Use {profile} in the name when planning several configurations.')
+        parser.add_argument('--apply', type=str, metavar='PLAN_FILE',
+                            help='Execute a sync plan written by --dry-run --plan-out.')
+        parser.add_argument('--metrics-out', type=str,
+                            help="Append each sync's timings and counters as a JSON line to this file ('-' prints them).")
+        parser.add_argument('--prometheus-out', type=str,
+                            help="Write each configuration's latest metrics for node_exporter's textfile collector, "
+                                 "to this file with the configuration's name added, e.g. timeeditarc_<name>.prom.")
+        verbosity = parser.add_mutually_exclusive_group()
+        verbosity.add_argument('--quiet', action='store_true', help='Only log warnings and errors.')
+        verbosity.add_argument('--verbose', action='store_true', help='Log what happens to every event.')
+        parser.add_argument('--json-log', action='store_true', help='Log as JSON lines instead of text.')
         parser.add_argument('--update', action='store_true', help='Only update existing events.')
+        parser.add_argument('--no-prefetch', action='store_true',
+                            help='Search the calendar once per event instead of prefetching it.')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Keep a local mirror of the calendar and only fetch what changed since the last run.')
+        parser.add_argument('--stream', action='store_true',
+                            help='Parse and sync the iCal feed event by event while it downloads.')
+        parser.add_argument('--force', action='store_true',
+                            help='Sync even if the iCal feed has not changed since the last run.')
+        parser.add_argument('--concurrency', type=int, default=0,
+                            help='Number of events to sync at the same time, keeping that many API calls in flight '
+                                 '(0 syncs one event at a time).')
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Number of inserts/updates to send per batch request (0 disables batching).')
 
         args = parser.parse_args()
+        # Applying a plan writes to the calendar, so it can't be a dry run or make a plan of its own
+        if args.apply and (args.dry_run or args.plan_out):
+            parser.error("--apply cannot be combined with --dry-run or --plan-out")
+        if args.sync_from or args.sync_to:
+            from src.ICalManager import parse_window_bound
+            for bound in (args.sync_from, args.sync_to):
+                try:
+                    if bound:
+                        parse_window_bound(bound)
+                except ValueError:
+                    parser.error(f"invalid date: {bound}")
+        level = logging.WARNING if args.quiet else logging.DEBUG if args.verbose else logging.INFO
+        configure_logging(level, args.json_log)
+        options = {'prefetch': not args.no_prefetch, 'batch_size': args.batch_size,
+                   'force': args.force, 'stream': args.stream, 'incremental': args.incremental,
+                   'dry_run': args.dry_run, 'plan_out': args.plan_out,
+                   'metrics_out': args.metrics_out, 'prometheus_out': args.prometheus_out,
+                   'reconcile': args.reconcile, 'sync_from': args.sync_from, 'sync_to': args.sync_to,
+                   'concurrency': args.concurrency}
+
+        if args.apply:
+            self.apply_plan(args.apply, args.config, options)
+            return True
+
+        if args.daemon:
+            from src.SyncDaemon import SyncDaemon
+            from src.SyncRunner import SyncRunner
+            if args.config or args.configs:
+                config_names = [name.strip() for name in (args.configs or args.config).split(',') if name.strip()]
+            else:
+                config_names = None
+            configs = self.config_manager.load_configurations_by_names(config_names)
+            SyncDaemon(configs, SyncRunner(args.update, **options), args.interval).run()
+            return True
+
+        if args.all or args.configs:
+            config_names = None if args.all else [name.strip() for name in args.configs.split(',') if name.strip()]
+            configs = self.config_manager.load_configurations_by_names(config_names)
+            if args.plan_out and '{profile}' not in args.plan_out and len(configs) > 1:
+                print("Error: Use {profile} in --plan-out when planning several configurations.")
+                return True
+            from src.SyncRunner import SyncRunner, log_summaries
+            runner = SyncRunner(args.update, **options)
+            log_summaries(runner.sync_profiles(configs, args.workers))
+            return True
 
         if args.config:
             self.config = self.config_manager.load_configuration_by_name(args.config)
             if self.config:
                 print(f"Configuration '{args.config}' has been loaded successfully!\n")
-                self.process_calendar(args.update)
+                self.process_calendar(args.update, **options)
             else:
                 print(f"Error: Configuration '{args.config}' not found!")
+        return False
+
+    def apply_plan(self, plan_file, config_name, options):
+        try:
+            plan = SyncPlan.load(plan_file)
+        except (OSError, ValueError) as e:
+            print(f"Error: Could not read the sync plan: {e}")
+            return
+        config_name = config_name or plan.config_name
+        self.config = self.config_manager.load_configuration_by_name(config_name)
+        if not self.config:
+            print(f"Error: Configuration '{config_name}' not found!")
+            return
+        print(f"Applying the sync plan from {plan.created}: {plan.summary()}")
+        options = {key: value for key, value in options.items()
+                   if key in ('batch_size', 'metrics_out', 'prometheus_out')}
+        from src.SyncRunner import SyncRunner
+        result = SyncRunner(**options).apply_plan(self.config, plan)
+        if result['status'] == 'synced':
+            print("Your calendar has now been imported/updated.")
+        elif result.get('error'):
+            print(f"Error: {result['error']}")
 
     def main_menu(self):
         clear_screen()
@@ -85,6 +200,7 @@ Enter your choice (1/2/3/4/5/6/7):
             self.config_manager.rename_profile()
         elif choice == '5':
             clear_screen()
+            from src.get_calendar_service import logout
             logout()
         elif choice == '6':
             self.config = ensure_config_loaded(self.config_manager, self.config)
@@ -105,14 +221,12 @@ Enter your choice (1/2/3/4/5/6/7):
             clear_screen()
             print("Invalid choice. Please try again.")
 
-    def process_calendar(self, only_update_existing_events):
-        ical_manager = ICalManager(self.config)
-        ical_data = ical_manager.run()
-        calendar_manager = CalendarManager(self.config)
-        for event in ical_data.walk('vevent'):
-            calendar_manager.create_or_update_event(event, only_update_existing_events)
-            print("")
-        print("Your calendar has now been imported/updated.")
+    def process_calendar(self, only_update_existing_events, **options):
+        from src.SyncRunner import SyncRunner
+        runner = SyncRunner(only_update_existing_events, **options)
+        result = runner.sync_profile(self.config)
+        if result['status'] == 'synced':
+            print("Your calendar has now been imported/updated.")
 
 
 def clear_screen():
@@ -0,0 +1,49 @@
+# AsyncSyncEngine.py
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from src.get_calendar_service import get_calendar_service
+
+
+class AsyncSyncEngine:
+    """Sync events with up to `concurrency` events, and so API calls, in flight at once.
+
+    Each event still goes through CalendarManager.create_or_update_event, so lookups, planning and writes
+    work exactly as in a sequential sync. The calls are blocking, so they run on a thread pool where every
+    worker thread builds its requests on its own Calendar service.
+    """
+
+    def __init__(self, calendar_manager, concurrency=8, service_factory=None):
+        self.calendar_manager = calendar_manager
+        self.concurrency = max(1, concurrency)
+        self.service_factory = service_factory if service_factory is not None else get_calendar_service
+
+    def run(self, events, only_update_existing_events):
+        asyncio.run(self.sync_events(events, only_update_existing_events))
+
+    async def sync_events(self, events, only_update_existing_events):
+        loop = asyncio.get_running_loop()
+        # Taken before the next event is read, so a streamed feed is only read as fast as it is synced
+        slots = asyncio.Semaphore(self.concurrency)
+        # Events with the same UID are synced one after another, in feed order
+        event_locks = {}
+        self.calendar_manager.use_thread_services(self.service_factory)
+
+        async def sync_event(record):
+            try:
+                lock = event_locks.setdefault(record.uid or id(record), asyncio.Lock())
+                async with lock:
+                    await loop.run_in_executor(pool, self.calendar_manager.create_or_update_event,
+                                               record, only_update_existing_events)
+            finally:
+                slots.release()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='sync') as pool:
+                tasks = []
+                for record in events:
+                    await slots.acquire()
+                    tasks.append(loop.create_task(sync_event(record)))
+                await asyncio.gather(*tasks)
+        finally:
+            self.calendar_manager.use_thread_services(None)
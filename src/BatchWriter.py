@@ -0,0 +1,98 @@
+# BatchWriter.py
+
+import time
+import threading
+from src.RequestExecutor import RequestExecutor, is_retryable, is_rate_limited, is_missing
+
+# Google Calendar accepts at most this many calls in one batch request
+MAX_BATCH_SIZE = 1000
+
+
+class BatchWriter:
+    def __init__(self, service, batch_size=50, executor=None, http=None):
+        self.service = service
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        # Rate limiting and backoff are shared with the calls that aren't batched
+        self.executor = executor if executor is not None else RequestExecutor()
+        self.http = http
+        # How long to back off before sending items that failed with a retryable error
+        self.retry_wait = 0
+        self.pending = []
+        # Requests may be queued from several threads at once, and are sent one batch at a time
+        self.lock = threading.RLock()
+        # Results: the number of successes, and (label, error) for the items that failed
+        self.succeeded = 0
+        self.failed = []
+        self.retryable = []
+
+    def add(self, request, label, on_success=None, allow_missing=False):
+        """Queue a request and send a batch once enough requests are queued.
+
+        With allow_missing, a 404 or 410 (e.g. deleting an event that is already gone) counts as a success.
+        """
+        with self.lock:
+            self.pending.append({'request': request, 'label': label, 'on_success': on_success,
+                                 'allow_missing': allow_missing, 'attempts': 0})
+            if len(self.pending) >= self.batch_size:
+                # A batch is sent on the connection of the thread sending it. Its requests may have been
+                # built by other threads, whose connections can be busy with calls of their own
+                self.send_batch(request.http)
+
+    def flush(self):
+        """Send everything that is queued, retrying retryable failures."""
+        with self.lock:
+            while self.pending:
+                self.send_batch()
+
+    def send_batch(self, http=None):
+        if self.retry_wait:
+            self.executor.metrics.add_time('backoff', self.retry_wait)
+            time.sleep(self.retry_wait)
+            self.retry_wait = 0
+        items, self.pending = self.pending[:self.batch_size], self.pending[self.batch_size:]
+
+        def callback(request_id, response, exception):
+            item = items[int(request_id)]
+            if exception is not None and item['allow_missing'] and is_missing(exception):
+                exception = response = None
+            if exception is None:
+                self.executor.record_success()
+                self.succeeded += 1
+                if item['on_success']:
+                    item['on_success'](response)
+            else:
+                self.record_failure(item, exception)
+
+        batch = self.service.new_batch_http_request(callback=callback)
+        for request_id, item in enumerate(items):
+            item['attempts'] += 1
+            if item['attempts'] > 1:
+                self.executor.metrics.count('api_retries')
+            self.executor.metrics.count_api_call(item['request'])
+            batch.add(item['request'], request_id=str(request_id))
+
+        # Every call in a batch counts against the quota on its own
+        self.executor.acquire(len(items))
+        self.executor.metrics.count('batch_requests')
+        try:
+            with self.executor.metrics.timer('write'):
+                batch.execute(http=self.http if self.http is not None else http)
+        except Exception as e:
+            # The whole batch failed to go through, so every item in it gets the same error
+            for item in items:
+                self.record_failure(item, e)
+
+    def record_failure(self, item, exception):
+        if is_rate_limited(exception):
+            self.executor.record_rate_limit()
+        if not is_retryable(exception):
+            self.failed.append((item['label'], exception))
+        elif item['attempts'] <= self.executor.max_retries:
+            self.pending.append(item)
+            self.retry_wait = max(self.retry_wait, self.executor.retry_delay(item['attempts'], exception))
+        else:
+            self.retryable.append((item['label'], exception))
+
+    def summary(self):
+        return (f"{self.succeeded} succeeded, {len(self.failed)} failed, "
+                f"{len(self.retryable)} failed with retryable errors")
@@ -1,22 +1,299 @@
 # CalendarManager.py
 
 import datetime
+import hashlib
+import json
+import logging
+import threading
 import pytz
+from googleapiclient.errors import HttpError
 from src.get_calendar_service import get_calendar_service
+from src.BatchWriter import BatchWriter
+from src.EventRecord import to_utc
+from src.RequestExecutor import RequestExecutor, is_missing
+from src.ICalManager import strip_date_stamps
+from src.SyncStateManager import SyncStateManager
+from src.SyncMetrics import SyncMetrics
+from src.SyncPlan import SyncPlan, CREATE, UPDATE, UNCHANGED, SKIP, DELETE
 from dateutil.parser import parse
 
+logger = logging.getLogger(__name__)
+
+# Private extended property that marks the events a profile created, holding the profile's name
+OWNER_PROPERTY = 'timeEditArcProfile'
+
 class CalendarManager:
-    def __init__(self, config):
+    def __init__(self, config, service=None, dry_run=False, metrics=None, window=None):
         self.config = config
-        self.service = get_calendar_service()
+        # The sync window's UTC (start, end), either may be None, or None without a window
+        self.window = window
+        # Time spent per phase, API calls and cache hits of this run
+        self.metrics = metrics if metrics is not None else SyncMetrics(config.get('config_name', 'default'))
+        # Plan everything as usual, but don't write to the calendar or the sync state
+        self.dry_run = dry_run
+        self.default_service = service if service is not None else get_calendar_service()
+        # Set by use_thread_services while several threads sync events at once
+        self.service_factory = None
+        self.thread_data = threading.local()
+        # Guards the error count and the lazily prefetched months when syncing concurrently
+        self.lock = threading.RLock()
+        # Every API call goes through the executor for rate limiting and retries
+        self.executor = RequestExecutor.from_config(config, self.metrics)
+        # Number of events that could not be synced because of an API error
+        self.errors = 0
+        # Local index of the target calendar, filled by prefetch_events
+        self.event_index = None
+        self.events_by_id = {}
+        # The series of the recurring events' occurrences in the target calendar, keyed like event_index
+        self.series_index = {}
+        self.series_ids = set()
+        # Months already fetched by prefetch_month, or None when the calendar is prefetched up front
+        self.prefetched_months = None
+        # Queue for inserts and updates, set up by start_batch
+        self.batch_writer = None
+        # What this run decided for each event, and which existing events were matched
+        self.plan = SyncPlan(self.config.get('config_name', 'default'), self.config['calendar_id'])
+        self.matched_event_ids = set()
+        # Events written by this tool are tagged with the profile they belong to
+        self.owner = self.config.get('config_name', 'default')
+        # Events' wall-clock times are sent to Google Calendar in the profile's time zone
+        self.time_zone = pytz.timezone(self.config['time_zone'])
+        # (earliest start, latest end) in UTC of the timed events in the feed, the window reconcile looks at
+        self.feed_span = None
+        # iCal UID -> Google event ID mapping kept between runs
+        self.state = SyncStateManager(self.config.get('config_name', 'default'))
+
+    # The service to build requests with. httplib2 connections can't be shared between threads,
+    # so with thread services every thread gets its own service from the factory
+    @property
+    def service(self):
+        if self.service_factory is None:
+            return self.default_service
+        service = getattr(self.thread_data, 'service', None)
+        if service is None:
+            service = self.thread_data.service = self.service_factory()
+        return service
+
+    def use_thread_services(self, service_factory):
+        self.service_factory = service_factory
+        self.thread_data = threading.local()
+
+    # Convert a datetime to UTC the same way a Google Calendar dateTime is compared
+    @staticmethod
+    def to_utc(dt):
+        return to_utc(dt)
+
+    # Fetch every event in the time span covered by the iCal events once and index it locally
+    def prefetch_events(self, records):
+        if self.service is None:
+            logger.error("Google Calendar service is not initialized.")
+            return
+
+        time_min = time_max = None
+        for record in records:
+            # All-day events are skipped when syncing, so they don't widen the span
+            if record.all_day:
+                continue
+            time_min = record.start_utc if time_min is None else min(time_min, record.start_utc)
+            time_max = record.end_utc if time_max is None else max(time_max, record.end_utc)
+
+        self.event_index = {}
+        if time_min is not None:
+            try:
+                # timeMax is exclusive, so pad it to include events that start at the very end of the span
+                with self.metrics.timer('prefetch'):
+                    self.prefetch_range(time_min, time_max + datetime.timedelta(seconds=1))
+            except Exception as e:
+                logger.warning("Could not prefetch the calendar: %s. Searching for each event instead.", e)
+                self.event_index = None
+                self.events_by_id = {}
+
+    # Prefetch the calendar one month at a time, as events come in, when the feed's span isn't known up front
+    def start_lazy_prefetch(self):
+        if self.service is None:
+            logger.error("Google Calendar service is not initialized.")
+            return
+        self.event_index = {}
+        self.prefetched_months = set()
+
+    def prefetch_month(self, start_utc):
+        month = (start_utc.year, start_utc.month)
+        if month in self.prefetched_months:
+            return
+        with self.lock:
+            # Another thread may have fetched the month while this one waited
+            if month in self.prefetched_months:
+                return
+            month_start = start_utc.replace(day=1, hour=0, minute=0, second=0)
+            next_month_start = (month_start + datetime.timedelta(days=32)).replace(day=1)
+            with self.metrics.timer('prefetch'):
+                self.prefetch_range(month_start, next_month_start)
+            # Only mark the month as done once it was fetched completely
+            self.prefetched_months.add(month)
+
+    # Page through the calendar between two UTC datetimes and add every event to the index
+    def prefetch_range(self, time_min, time_max):
+        request = self.service.events().list(calendarId=self.config['calendar_id'],
+                                             timeMin=time_min.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                                             timeMax=time_max.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                                             singleEvents=True,
+                                             maxResults=2500)
+        pages = 0
+        while request is not None:
+            events_result = self.executor.execute(request)
+            pages += 1
+            for event in events_result.get('items', []):
+                self.index_event(event)
+            request = self.service.events().list_next(request, events_result)
+
+        logger.info("Prefetched %d events in %d page(s) between %s and %s.", len(self.event_index), pages, time_min, time_max)
+
+    # Bring the local mirror of the calendar up to date with the Calendar API's sync tokens and index it
+    def incremental_sync(self):
+        with self.metrics.timer('prefetch'):
+            self.sync_mirror()
+
+    def sync_mirror(self):
+        calendar_id = self.config['calendar_id']
+        sync_token = self.state.get_sync_token(calendar_id)
+        try:
+            next_sync_token, changes = self.apply_calendar_changes(sync_token)
+        except HttpError as e:
+            # Google expires sync tokens now and then, and the only way on is a full resync
+            if sync_token is None or int(e.resp.status) != 410:
+                raise
+            logger.warning("The calendar's sync token has expired. Doing a full sync instead.")
+            next_sync_token, changes = self.apply_calendar_changes(None)
+        self.state.set_sync_token(calendar_id, next_sync_token)
+        self.state.save()
+
+        self.event_index = {}
+        for event in self.state.iter_mirror_events(calendar_id):
+            self.index_event(event)
+        logger.info("Applied %d calendar change(s). %d events are mirrored locally.", changes, len(self.events_by_id))
+
+    # Page through the changes since sync_token, or the whole calendar if there is none, into the mirror
+    def apply_calendar_changes(self, sync_token):
+        calendar_id = self.config['calendar_id']
+        if sync_token is None:
+            self.state.clear_mirror(calendar_id)
+            request = self.service.events().list(calendarId=calendar_id, singleEvents=True, maxResults=2500)
+        else:
+            request = self.service.events().list(calendarId=calendar_id, singleEvents=True, maxResults=2500,
+                                                 syncToken=sync_token)
+
+        changes = 0
+        next_sync_token = None
+        while request is not None:
+            events_result = self.executor.execute(request)
+            for event in events_result.get('items', []):
+                changes += 1
+                if event.get('status') == 'cancelled':
+                    self.state.remove_mirror_event(calendar_id, event['id'])
+                else:
+                    self.state.put_mirror_event(calendar_id, event)
+            # Only the last page carries the token for the next sync
+            next_sync_token = events_result.get('nextSyncToken', next_sync_token)
+            request = self.service.events().list_next(request, events_result)
+        return next_sync_token, changes
+
+    # Add a Google Calendar event to the local index, keyed on summary and UTC start time
+    def index_event(self, event):
+        start = event.get('start', {}).get('dateTime')
+        # All-day events in the target calendar can never match a synced event
+        if not start:
+            return
+        key = (event.get('summary', ''), self.to_utc(parse(start)))
+        # Occurrences of recurring events are listed one by one, and only match a recurring event, as their series
+        if event.get('recurringEventId'):
+            self.series_index.setdefault(key, event['recurringEventId'])
+            self.series_ids.add(event['recurringEventId'])
+            return
+        # Keep the earliest listed event, like the search in find_existing_event does
+        self.event_index.setdefault(key, event)
+        self.events_by_id[event['id']] = event
+
+    # Collect inserts and updates and send them as batch requests instead of one call each
+    def start_batch(self, batch_size=50):
+        self.batch_writer = BatchWriter(self.service, batch_size, self.executor)
+
+    # Send any queued writes, report how they went and return whether all of them succeeded
+    def flush_batch(self):
+        if self.batch_writer is None:
+            return not self.errors
+        self.batch_writer.flush()
+        logger.info("Batched writes: %s", self.batch_writer.summary())
+        failures = self.batch_writer.failed + self.batch_writer.retryable
+        for label, error in failures:
+            logger.error("Failed to write %s: %s", label, error)
+        return not failures and not self.errors
+
+    # Execute a write request, or queue it if batching is enabled
+    def execute_write(self, request, label, message, on_success=None, allow_missing=False):
+        def report(response):
+            logger.debug("%s ID: %s", message, response['id'] if response else label)
+            if on_success:
+                on_success(response)
+
+        if self.batch_writer is not None:
+            self.batch_writer.add(request, label, on_success=report, allow_missing=allow_missing)
+            return
+        try:
+            with self.metrics.timer('write'):
+                response = self.executor.execute(request)
+        except HttpError as e:
+            if not (allow_missing and is_missing(e)):
+                raise
+            response = None
+        report(response)
+
+    # Write the sync state to disk
+    def save_state(self):
+        self.state.save()
+
+    # Look up an event by its ID, from the prefetched calendar if possible
+    def get_event_by_id(self, event_id):
+        if event_id in self.events_by_id:
+            self.metrics.count('event_cache_hits')
+            return self.events_by_id[event_id]
+        try:
+            event = self.executor.execute(self.service.events().get(calendarId=self.config['calendar_id'], eventId=event_id))
+        except HttpError as e:
+            if is_missing(e):
+                return None
+            raise
+        # Deleted events can still be fetched by ID, but they must not be matched
+        return None if event.get('status') == 'cancelled' else event
+
+    # Whether an event the sync state knows is still in the calendar, as far as the local index can tell.
+    # Without an index it is trusted to be; with one, an event that isn't in it was deleted or moved away
+    def is_indexed(self, event_id, start_utc):
+        if self.event_index is None:
+            return True
+        if self.prefetched_months is not None:
+            self.prefetch_month(start_utc)
+        return event_id in self.events_by_id or event_id in self.series_ids
 
-    # Find an existing event with the same summary and start time
-    def find_existing_event(self, calendar_id, summary, start_time):
+    # Find an existing event with the same summary and start time, whose UTC start may be passed in if known.
+    # A recurring event is looked for as the series of an occurrence, or as a single event synced before
+    def find_existing_event(self, calendar_id, summary, start_time, start_utc=None, recurring=False):
         # Check if self.service is initialized
         if self.service is None:
-            print("Error: Google Calendar service is not initialized.")
+            logger.error("Google Calendar service is not initialized.")
             return None
-        
+
+        # Match against the prefetched calendar instead of searching, if available
+        if self.event_index is not None:
+            if start_utc is None:
+                start_utc = self.to_utc(start_time)
+            if self.prefetched_months is not None:
+                self.prefetch_month(start_utc)
+            self.metrics.count('index_lookups')
+            key = (str(summary), start_utc)
+            if recurring and key in self.series_index:
+                return self.get_event_by_id(self.series_index[key])
+            return self.event_index.get(key)
+
         # Convert start_time to RFC3339 format which Google Calendar API uses
         start_time_rfc = start_time.strftime('%Y-%m-%dT%H:%M:%S%z')
 
@@ -24,15 +301,15 @@ class CalendarManager:
         end_time = start_time.replace(hour=23, minute=59, second=59)
         end_time_rfc = end_time.strftime('%Y-%m-%dT%H:%M:%S%z')
 
-        events_result = self.service.events().list(calendarId=calendar_id, 
-                                              q=summary,  # search query
-                                              timeMin=start_time_rfc, 
-                                              timeMax=end_time_rfc,
-                                              singleEvents=True,
-                                              orderBy='startTime').execute()
+        events_result = self.executor.execute(self.service.events().list(calendarId=calendar_id,
+                                                                         q=summary,  # search query
+                                                                         timeMin=start_time_rfc,
+                                                                         timeMax=end_time_rfc,
+                                                                         singleEvents=True,
+                                                                         orderBy='startTime'))
 
         events = events_result.get('items', [])
-        print(f"Found {len(events)} events for the given day.")
+        logger.debug("Found %d events for the given day.", len(events))
 
         # Iterate through each event and find the exact match
         for event in events: 
@@ -40,66 +317,315 @@ class CalendarManager:
             start_time_utc = parse(start_time_rfc).astimezone(pytz.utc)
 
             if event_start_time_utc == start_time_utc:
-                return event
+                if not event.get('recurringEventId'):
+                    return event
+                if recurring:
+                    return self.get_event_by_id(event['recurringEventId'])
 
         # If no exact match found, return None
         return None
 
-    # Create or update a Google Calendar event
-    def create_or_update_event(self, event, only_update_existing_events):
-        # If the event is an all-day event (i.e., it's a date object and not a datetime object), skip it
-        if isinstance(event.get('dtstart').dt, datetime.date) and not isinstance(event.get('dtstart').dt, datetime.datetime):
-            print(f"Skipping all-day event: {event.get('summary')}")
-            return
-
+    # Build the Google Calendar representation of an event record
+    def build_google_event(self, record):
         google_event = {
-            'summary': event.get('summary'),
-            'location': event.get('location'),
-            'description': event.get('description'),
+            'summary': record.summary,
+            'location': record.location,
+            'description': record.description,
             'start': {
-                'dateTime': event.get('dtstart').dt.strftime('%Y-%m-%dT%H:%M:%S'),
+                'dateTime': record.start_local,
                 'timeZone': self.config['time_zone']
             },
             'end': {
-                'dateTime': event.get('dtend').dt.strftime('%Y-%m-%dT%H:%M:%S'),
+                'dateTime': record.end_local,
                 'timeZone': self.config['time_zone']
             },
+            'extendedProperties': {
+                'private': {OWNER_PROPERTY: self.owner}
+            },
         }
 
-        # Add colorId if it exists in the event
-        if 'colorId' in event:
-            google_event['colorId'] = event['colorId']
-        print(f"Checking for event: {google_event['summary']} at {event.get('dtstart').dt}")
+        # Add colorId if the event was given a color
+        if record.color_id is not None:
+            google_event['colorId'] = record.color_id
+        # A recurring event is synced as one event with its recurrence rules, not occurrence by occurrence
+        if record.recurring:
+            google_event['recurrence'] = self.recurrence_lines(record)
+        return google_event
+
+    # The RFC 5545 recurrence lines of a record. Like its start, its dates are sent as wall-clock times in the
+    # profile's time zone, so they line up with the occurrences Google Calendar works out
+    def recurrence_lines(self, record):
+        lines = [f"RRULE:{rule}" for rule in record.rrules]
+        for name, dates in (('RDATE', record.rdates), ('EXDATE', record.exdates)):
+            times = sorted({self.wall_clock(date, record.start).strftime('%Y%m%dT%H%M%S') for date in dates})
+            if times:
+                lines.append(f"{name};TZID={self.config['time_zone']}:{','.join(times)}")
+        return lines
+
+    # A recurrence date as a wall-clock time in the time zone of the event's start
+    @staticmethod
+    def wall_clock(date, start):
+        if not isinstance(date, datetime.datetime):
+            return datetime.datetime.combine(date, start.time())
+        if date.tzinfo is not None and start.tzinfo is not None:
+            date = date.astimezone(start.tzinfo)
+        return date.replace(tzinfo=None)
+
+    # The UTC start and end Google Calendar stores for a record, whose wall-clock times are sent in the profile's time zone
+    def calendar_times_utc(self, record):
+        return (self.to_utc(self.time_zone.localize(record.start.replace(tzinfo=None))),
+                self.to_utc(self.time_zone.localize(record.end.replace(tzinfo=None))))
+
+    # Convert a Google Calendar start/end object to a UTC datetime
+    def event_time_utc(self, event_time):
+        dt = parse(event_time['dateTime'])
+        if dt.tzinfo is None:
+            dt = pytz.timezone(event_time.get('timeZone', self.config['time_zone'])).localize(dt)
+        return self.to_utc(dt)
+
+    # Hash the fields that decide whether an event has to be written, given its UTC (start, end) if known
+    def content_hash(self, google_event, times=None):
+        start, end = times or (self.event_time_utc(google_event['start']), self.event_time_utc(google_event['end']))
+        content = {
+            'summary': str(google_event.get('summary') or ''),
+            'location': str(google_event.get('location') or ''),
+            'colorId': str(google_event.get('colorId') or ''),
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'description': strip_date_stamps(google_event.get('description')),
+            'owner': self.event_owner(google_event),
+        }
+        # Only recurring events hash their rules, so the hashes of single events stay as they were
+        if google_event.get('recurrence'):
+            content['recurrence'] = google_event['recurrence']
+        return hashlib.sha256(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
+
+    # Return the profile an event is tagged with, if any
+    @staticmethod
+    def event_owner(google_event):
+        return str(google_event.get('extendedProperties', {}).get('private', {}).get(OWNER_PROPERTY) or '')
+
+    # Compare an event to be synced with the existing Google event and return the fields that differ
+    def diff_event(self, google_event, existing_event, times=None):
+        changes = {}
+        for field in ('summary', 'location', 'colorId'):
+            new, old = str(google_event.get(field) or ''), str(existing_event.get(field) or '')
+            if new != old:
+                changes[field] = {'old': old, 'new': new}
+
+        times = times or (self.event_time_utc(google_event['start']), self.event_time_utc(google_event['end']))
+        for field, new in zip(('start', 'end'), times):
+            old = self.event_time_utc(existing_event[field])
+            if new != old:
+                changes[field] = {'old': old.isoformat(), 'new': new.isoformat()}
+
+        # The date stamps change every run, so only the rest of the description counts
+        new = strip_date_stamps(google_event.get('description'))
+        old = strip_date_stamps(existing_event.get('description'))
+        if new != old:
+            changes['description'] = {'old': old, 'new': new}
+
+        new, old = google_event.get('recurrence') or [], existing_event.get('recurrence') or []
+        if new != old:
+            changes['recurrence'] = {'old': old, 'new': new}
+
+        # Events synced before they were tagged are updated once to take ownership of them
+        new, old = self.event_owner(google_event), self.event_owner(existing_event)
+        if new != old:
+            changes['owner'] = {'old': old, 'new': new}
+        return changes
+
+    # Keep the "Date added" stamp of the existing event and mark the description as updated today
+    @staticmethod
+    def merge_description(description, existing_description):
+        date_added = next((line for line in (existing_description or '').split('\n') if line.startswith('Date added:')),
+                          f"Date added: {datetime.date.today()}")
+        parts = (date_added, strip_date_stamps(description), f"Date updated: {datetime.date.today()}")
+        return '\n'.join(part for part in parts if part)
+
+    # Decide whether an event record has to be created, updated or left alone
+    def plan_event(self, record, only_update_existing_events):
+        # If the event is an all-day event (i.e., it has a date and not a datetime), skip it
+        if record.all_day:
+            logger.debug("Skipping all-day event: %s", record.summary)
+            return None
+
+        google_event = self.build_google_event(record)
+        logger.debug("Checking for event: %s at %s", record.summary, record.start)
+        uid = record.sync_uid
+        times = self.calendar_times_utc(record)
+        content_hash = record.content_hash = self.content_hash(google_event, times)
+        self.extend_feed_span(record)
+
+        # Go straight to the event this UID was synced to before, if there is one
+        existing_event = None
+        synced = self.state.get(self.config['calendar_id'], uid) if uid else None
+        if synced:
+            event_id, synced_hash = synced
+            if synced_hash == content_hash and self.is_indexed(event_id, record.start_utc):
+                self.metrics.count('state_hits')
+                self.matched_event_ids.add(event_id)
+                return self.plan.add(UNCHANGED, google_event['summary'], event_id, uid=uid, content_hash=content_hash)
+            with self.metrics.timer('match'):
+                existing_event = self.get_event_by_id(event_id)
+            if existing_event is None:
+                # The event was removed from Google Calendar, so match it like an unknown UID
+                self.state.forget(self.config['calendar_id'], uid)
 
         # Check if an event with the same summary and start time already exists
-        existing_event = self.find_existing_event(self.config['calendar_id'], google_event['summary'], event.get('dtstart').dt)
+        if existing_event is None:
+            with self.metrics.timer('match'):
+                existing_event = self.find_existing_event(self.config['calendar_id'], google_event['summary'],
+                                                          record.start, record.start_utc, record.recurring)
 
         if existing_event:
-            # Update the event
-            updated_event = self.service.events().update(calendarId=self.config['calendar_id'], eventId=existing_event['id'], body=google_event).execute()
-            print(f"Event updated. ID: {updated_event['id']}")
-            self.print_event(event)
-        elif not only_update_existing_events:
-            # Insert a new event
-            created_event = self.service.events().insert(calendarId=self.config['calendar_id'], body=google_event).execute()
-            print("No existing event found.")
-            print(f"Event created. ID: {created_event['id']}")
+            self.matched_event_ids.add(existing_event['id'])
+            changes = self.diff_event(google_event, existing_event, times)
+            if not changes:
+                if uid and not self.dry_run:
+                    self.state.put(self.config['calendar_id'], uid, existing_event['id'], content_hash)
+                return self.plan.add(UNCHANGED, google_event['summary'], existing_event['id'],
+                                     uid=uid, content_hash=content_hash)
+            google_event['description'] = self.merge_description(google_event['description'],
+                                                                 existing_event.get('description'))
+            # An update replaces the whole event, so keep private properties set by others
+            private = dict(existing_event.get('extendedProperties', {}).get('private', {}))
+            private.update(google_event['extendedProperties']['private'])
+            google_event['extendedProperties']['private'] = private
+            return self.plan.add(UPDATE, google_event['summary'], existing_event['id'], google_event, changes,
+                                 uid=uid, content_hash=content_hash)
+        if not only_update_existing_events:
+            return self.plan.add(CREATE, google_event['summary'], body=google_event, uid=uid, content_hash=content_hash)
+        return self.plan.add(SKIP, google_event['summary'], uid=uid)
+
+    # Widen the feed's span to include a timed event
+    def extend_feed_span(self, record):
+        # Events are planned on several threads by a concurrent sync, and no extension may be lost
+        with self.lock:
+            if self.feed_span is None:
+                self.feed_span = (record.start_utc, record.end_utc)
+            else:
+                self.feed_span = (min(self.feed_span[0], record.start_utc), max(self.feed_span[1], record.end_utc))
+
+    # Send the write a planned item needs, if any
+    def apply_item(self, item):
+        if self.dry_run:
+            if item['action'] in (CREATE, UPDATE, DELETE):
+                logger.info("Would %s event: %s %s", item['action'], item['summary'], ', '.join(item['changes']))
+            return
+
+        def remember(response):
+            # Events created in this run must not be taken for events that left the feed
+            self.matched_event_ids.add(response['id'])
+            if item['uid']:
+                self.state.put(self.config['calendar_id'], item['uid'], response['id'], item['content_hash'])
+
+        def forget(response):
+            self.state.forget_event(self.config['calendar_id'], item['event_id'])
+
+        if item['action'] == UPDATE:
+            request = self.service.events().update(calendarId=self.config['calendar_id'], eventId=item['event_id'], body=item['body'])
+            logger.debug("Changed fields: %s", ', '.join(item['changes']))
+            self.execute_write(request, item['summary'], "Event updated.", remember)
+        elif item['action'] == CREATE:
+            request = self.service.events().insert(calendarId=self.config['calendar_id'], body=item['body'])
+            logger.debug("No existing event found.")
+            self.execute_write(request, item['summary'], "Event created.", remember)
+        elif item['action'] == DELETE:
+            request = self.service.events().delete(calendarId=self.config['calendar_id'], eventId=item['event_id'])
+            logger.debug("Event is no longer in the feed.")
+            # Events someone already deleted are as good as deleted
+            self.execute_write(request, item['summary'], "Event deleted.", forget, allow_missing=True)
+        elif item['action'] == UNCHANGED:
+            logger.debug("Event unchanged. ID: %s", item['event_id'])
         else:
             # No existing event found and only_update_existing_events is True
-            print("No existing event found. Skipping...")
-
-    # Print the event's details
-    def print_event(self, event):
-        summary = event.get('summary')
-        dtstart = event.get('dtstart').dt
-        dtend = event.get('dtend').dt
-        location = event.get('location')
-        description = event.get('description')
-        organizer = event.get('organizer')
-        print(f"summary: {summary}")
-        print(f"dtstart: {dtstart}")
-        print(f"dtend: {dtend}")
-        print(f"location: {location}")
-        print(f"description: {description}")
-        print(f"organizer: {organizer}")
-        print("-" * 40)
\ No newline at end of file
+            logger.debug("No existing event found. Skipping...")
+
+    # Create or update a Google Calendar event, skipping events that have not changed
+    def create_or_update_event(self, record, only_update_existing_events):
+        try:
+            item = self.plan_event(record, only_update_existing_events)
+            if item is not None:
+                self.apply_item(item)
+                if item['action'] == UPDATE and logger.isEnabledFor(logging.DEBUG):
+                    self.log_event(record)
+        except Exception as e:
+            # Calls that still fail after retrying cost this event, not the whole run
+            with self.lock:
+                self.errors += 1
+            logger.error("Error syncing event %s: %s", record.summary, e)
+
+    # Execute the writes of a plan made earlier, e.g. with a dry run
+    def apply_plan(self, plan):
+        for item in plan.items:
+            if item['action'] not in (CREATE, UPDATE, DELETE):
+                continue
+            try:
+                self.apply_item(item)
+            except Exception as e:
+                self.errors += 1
+                logger.error("Error applying the plan for %s: %s", item['summary'], e)
+
+    # Plan deletions for the events this profile owns in the feed's span that no feed event matched
+    def plan_deletions(self):
+        if self.feed_span is None:
+            # An empty feed is more likely a broken one than a cancelled semester
+            return []
+        time_min, time_max = self.feed_span
+        # timeMax is exclusive, so pad it to include events that start at the very end of the span
+        time_max += datetime.timedelta(seconds=1)
+        # Recurring events are synced whenever they start, but events outside the window were never read,
+        # so they must not look like they left the feed
+        window_min, window_max = self.window or (None, None)
+        if window_min is not None:
+            time_min = max(time_min, window_min)
+        if window_max is not None:
+            time_max = min(time_max, window_max)
+        if time_min >= time_max:
+            return []
+        # Only our own events are listed, however much else is in the calendar
+        request = self.service.events().list(calendarId=self.config['calendar_id'],
+                                             privateExtendedProperty=f"{OWNER_PROPERTY}={self.owner}",
+                                             timeMin=time_min.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                                             timeMax=time_max.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                                             singleEvents=True,
+                                             maxResults=2500)
+        items = []
+        planned = set()
+        while request is not None:
+            events_result = self.executor.execute(request)
+            for event in events_result.get('items', []):
+                # An event that starts before the window and only ends in it wasn't read either
+                start = event.get('start', {})
+                if window_min is not None and 'dateTime' in start and self.event_time_utc(start) < window_min:
+                    continue
+                # The occurrences of a recurring event stand for their series, which is deleted as a whole
+                event_id = event.get('recurringEventId', event['id'])
+                if event_id not in self.matched_event_ids and event_id not in planned and event.get('status') != 'cancelled':
+                    planned.add(event_id)
+                    items.append(self.plan.add(DELETE, event.get('summary', ''), event_id))
+            request = self.service.events().list_next(request, events_result)
+        return items
+
+    # Delete the events this profile owns that are no longer in the feed
+    def reconcile(self):
+        if self.errors:
+            # An event that failed to sync would look like it had left the feed
+            logger.warning("Not deleting events that left the feed, since some events could not be synced.")
+            return []
+        with self.metrics.timer('reconcile'):
+            removed = self.plan_deletions()
+        for item in removed:
+            try:
+                self.apply_item(item)
+            except Exception as e:
+                self.errors += 1
+                logger.error("Error deleting event %s: %s", item['summary'], e)
+        return removed
+
+    # Log the event's details
+    @staticmethod
+    def log_event(record):
+        logger.debug("summary: %s\ndtstart: %s\ndtend: %s\nlocation: %s\ndescription: %s",
+                     record.summary, record.start, record.end, record.location, record.description)
\ No newline at end of file
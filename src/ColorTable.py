@@ -0,0 +1,86 @@
+# ColorTable.py
+
+import os
+import sqlite3
+from collections import Counter
+from contextlib import closing
+
+COLOR_DIR = 'config/colors'
+
+# Google Calendar's event color IDs
+EVENT_COLORS = ("1", "2", "3", "4", "5", "6", "7", "8", "9", "10", "11")
+
+
+class ColorTable:
+    """The colors of a calendar's course and activity combinations, kept between runs and shared by every
+    profile that syncs into the calendar, so a combination keeps its color whatever order the feed is in.
+
+    A new combination gets the first color, in Google's order, that no combination has yet. Once every color
+    is taken it shares the color the fewest combinations have. A combination whose color has since been
+    excluded gets a new one the same way. New colors are written as soon as they are assigned, unless the
+    table is read_only (for dry runs).
+    """
+
+    def __init__(self, calendar_id, excluded_colors=(), color_dir=COLOR_DIR, read_only=False):
+        os.makedirs(color_dir, exist_ok=True)
+        self.path = os.path.join(color_dir, 'colors.sqlite3')
+        self.calendar_id = calendar_id
+        self.colors = tuple(color for color in EVENT_COLORS if color not in excluded_colors)
+        self.read_only = read_only
+        with closing(self.connect()) as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS calendar_colors (
+                    calendar_id TEXT NOT NULL,
+                    course_code TEXT NOT NULL,
+                    activity TEXT NOT NULL,
+                    color_id TEXT NOT NULL,
+                    PRIMARY KEY (calendar_id, course_code, activity)
+                )""")
+            self.load(connection)
+
+    def connect(self):
+        # Transactions are begun explicitly, and other profiles' writes are waited for
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def load(self, connection):
+        rows = connection.execute(
+            "SELECT course_code, activity, color_id FROM calendar_colors WHERE calendar_id = ?",
+            (self.calendar_id,)).fetchall()
+        self.assignments = {(course_code, activity): color_id for course_code, activity, color_id in rows}
+        self.usage = Counter(self.assignments.values())
+
+    def color_for(self, course_code, activity):
+        """Return the color of a course and activity combination, assigning one if it has none."""
+        key = (course_code or '', activity or '')
+        color = self.assignments.get(key)
+        if color in self.colors or not self.colors:
+            return color
+        if self.read_only:
+            return self.assign(key)
+        with closing(self.connect()) as connection:
+            # Profiles syncing into the same calendar at the same time take turns, each seeing the colors the
+            # others have assigned, so two combinations never take the same free color
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                self.load(connection)
+                color = self.assignments.get(key)
+                if color not in self.colors:
+                    color = self.assign(key)
+                    connection.execute(
+                        "INSERT OR REPLACE INTO calendar_colors (calendar_id, course_code, activity, color_id) "
+                        "VALUES (?, ?, ?, ?)", (self.calendar_id, key[0], key[1], color))
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        return color
+
+    def assign(self, key):
+        old_color = self.assignments.get(key)
+        if old_color is not None:
+            self.usage[old_color] -= 1
+        # min keeps the first of the least used colors, so free colors are handed out in order
+        color = min(self.colors, key=lambda candidate: self.usage[candidate])
+        self.usage[color] += 1
+        self.assignments[key] = color
+        return color
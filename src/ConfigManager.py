@@ -2,6 +2,7 @@
 
 import configparser
 import os
+import re
 
 class ConfigManager:
     def __init__(self, config=None):
@@ -14,7 +15,7 @@ class ConfigManager:
         clear_screen()
         config_name = input("Enter configuration name (e.g., development, production): \n")
         calendar_id = input(f"Enter calendar ID for {config_name}: ")
-        ical_url = input(f"Enter iCal URL for {config_name}: ")
+        ical_urls = input(f"Enter iCal URL for {config_name} (separate several feeds with spaces): ").split()
 
         self.config = configparser.ConfigParser()
         self.config.read('config/config.ini')
@@ -22,10 +23,13 @@ class ConfigManager:
         self.config[config_name] = {
             'config_name': config_name,
             'calendar_id': calendar_id,
-            'ical_url': ical_url,
+            'ical_url': ical_urls[0] if ical_urls else '',
             'time_zone': 'Etc/GMT',
             'excluded_colors': '',	
         }
+        # Several feeds are merged into the one calendar
+        if len(ical_urls) > 1:
+            self.config[config_name]['ical_urls'] = '\n'.join(ical_urls)
 
         with open('config/config.ini', 'w') as configfile:
             self.config.write(configfile)
@@ -75,6 +79,20 @@ class ConfigManager:
         else:
             return None
 
+    def load_configurations_by_names(self, config_names=None):
+        """Load several configurations by name, or all of them if no names are given."""
+        self.config_parser.read('config/config.ini')
+        if config_names is None:
+            config_names = self.config_parser.sections()
+
+        configs = []
+        for config_name in config_names:
+            if config_name in self.config_parser:
+                configs.append(self.config_parser[config_name])
+            else:
+                print(f"Error: Configuration '{config_name}' not found!")
+        return configs
+
     def remove_profile(self):
         clear_screen()
         self.config = configparser.ConfigParser()
@@ -207,4 +225,8 @@ class ConfigManager:
 
 
 def clear_screen():
-    os.system('cls' if os.name == 'nt' else 'clear')
\ No newline at end of file
+    os.system('cls' if os.name == 'nt' else 'clear')
+
+def safe_file_name(profile_name):
+    """Turn a profile name into something that can be used as a file name."""
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', profile_name)
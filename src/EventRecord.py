@@ -0,0 +1,91 @@
+# EventRecord.py
+
+import datetime
+import pytz
+
+
+# Convert a datetime to UTC the same way a Google Calendar dateTime is compared
+def to_utc(dt):
+    return dt.astimezone(pytz.utc).replace(microsecond=0)
+
+
+def property_values(event, name):
+    """Return every value of a property that may appear more than once, such as RRULE or EXDATE."""
+    value = event.get(name)
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def property_dates(event, name):
+    """Return the dates and datetimes of every RDATE or EXDATE of an event, leaving out periods."""
+    return tuple(entry.dt for value in property_values(event, name) for entry in value.dts
+                 if isinstance(entry.dt, datetime.date))
+
+
+class EventRecord:
+    """One feed event as the sync needs it, built once per VEVENT instead of keeping the icalendar component.
+
+    Times are converted once: start and end keep the feed's values, start_utc and end_utc are what events are
+    matched on, and start_local and end_local are the wall-clock dateTime strings sent to Google Calendar.
+    """
+
+    __slots__ = ('uid', 'recurrence_id', 'rrules', 'rdates', 'exdates', 'summary', 'location', 'description',
+                 'start', 'end', 'all_day', 'start_utc', 'end_utc', 'start_local', 'end_local', 'course_code',
+                 'course_name', 'activity', 'color_id', 'content_hash')
+
+    def __init__(self, uid, summary, start, end=None, location=None, description='', recurrence_id=None,
+                 rrules=(), rdates=(), exdates=()):
+        self.uid = uid
+        # Set for an occurrence of a recurring event that the feed overrides
+        self.recurrence_id = recurrence_id
+        # The RRULE values and the RDATE and EXDATE dates of a recurring event, empty for a single event
+        self.rrules = rrules
+        self.rdates = rdates
+        self.exdates = exdates
+        self.summary = summary
+        self.location = location
+        self.description = description
+        self.start = start
+        self.end = end if end is not None else start
+        # All-day events have dates instead of datetimes, and are never synced
+        self.all_day = not isinstance(start, datetime.datetime)
+        if self.all_day:
+            self.start_utc = self.end_utc = self.start_local = self.end_local = None
+        else:
+            self.start_utc, self.end_utc = to_utc(self.start), to_utc(self.end)
+            self.start_local = self.start.strftime('%Y-%m-%dT%H:%M:%S')
+            self.end_local = self.end.strftime('%Y-%m-%dT%H:%M:%S')
+        # Filled in by the transform
+        self.course_code = None
+        self.course_name = None
+        self.activity = None
+        self.color_id = None
+        # Filled in when the event is planned
+        self.content_hash = None
+
+    @classmethod
+    def from_vevent(cls, event):
+        """Build a record from an icalendar VEVENT, before it is transformed."""
+        dtend = event.get('dtend')
+        recurrence_id = event.get('recurrence-id')
+        location = event.get('location')
+        rrules = tuple(rule.to_ical().decode('utf-8') for rule in property_values(event, 'rrule'))
+        return cls(str(event.get('uid') or ''), str(event.get('summary') or ''), event.get('dtstart').dt,
+                   dtend.dt if dtend is not None else None, str(location) if location is not None else None,
+                   str(event.get('description') or ''), recurrence_id.dt if recurrence_id is not None else None,
+                   rrules, property_dates(event, 'rdate'), property_dates(event, 'exdate'))
+
+    @property
+    def recurring(self):
+        return bool(self.rrules or self.rdates)
+
+    @property
+    def sync_uid(self):
+        """The key the sync state keeps the event under. Overridden occurrences share their series' UID."""
+        if self.recurrence_id is None or not self.uid:
+            return self.uid
+        return f"{self.uid}#{self.recurrence_id.isoformat()}"
+
+    def __repr__(self):
+        return f"EventRecord({self.uid!r}, {self.summary!r}, {self.start!r})"
@@ -0,0 +1,102 @@
+# FeedCache.py
+
+import os
+import json
+import hashlib
+from src.ConfigManager import safe_file_name
+
+CACHE_DIR = 'config/cache/feeds'
+
+
+class FeedCache:
+    def __init__(self, profile_name, cache_dir=CACHE_DIR, settings=None):
+        os.makedirs(cache_dir, exist_ok=True)
+        base = os.path.join(cache_dir, safe_file_name(profile_name))
+        self.body_path = f"{base}.ics"
+        self.meta_path = f"{base}.json"
+        # A digest of the sync window and profile settings the feed is synced with, saved with the response
+        self.settings = settings
+        # Response waiting to be saved once the sync that used it has finished, and whether its body is new
+        self.staged = None
+        self.staged_body = False
+
+    def load_meta(self):
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as meta_file:
+                return json.load(meta_file)
+        except (OSError, ValueError):
+            return {}
+
+    def request_headers(self):
+        """Return the conditional request headers for the cached response, if there is one."""
+        if not os.path.exists(self.body_path):
+            return {}
+        meta = self.load_meta()
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def matches(self, body):
+        """Return True if body is the same as the cached response, for servers without validators."""
+        if not os.path.exists(self.body_path):
+            return False
+        meta = self.load_meta()
+        return meta.get('sha256') == content_hash(body) and meta.get('settings') == self.settings
+
+    def settings_changed(self):
+        """Return True if the cached response was synced with a different sync window or profile settings."""
+        return self.load_meta().get('settings') != self.settings
+
+    def read_body(self):
+        with open(self.body_path, 'r', encoding='utf-8', newline='') as body_file:
+            return body_file.read()
+
+    def iter_body_lines(self):
+        """Yield the cached feed line by line without reading it all into memory."""
+        with open(self.body_path, 'r', encoding='utf-8', newline='') as body_file:
+            for line in body_file:
+                yield line.rstrip('\r\n')
+
+    def stage(self, body, etag, last_modified):
+        """Write a new response next to the cached one, to be saved once it has been synced."""
+        self.staged = {'etag': etag, 'last_modified': last_modified, 'sha256': content_hash(body), 'settings': self.settings}
+        self.staged_body = True
+        with open(f"{self.body_path}.part", 'w', encoding='utf-8', newline='') as part_file:
+            part_file.write(body)
+
+    def stage_lines(self, lines, etag, last_modified):
+        """Like stage, but pass the lines of a streamed response through while writing them."""
+        digest = hashlib.sha256()
+        with open(f"{self.body_path}.part", 'w', encoding='utf-8', newline='') as part_file:
+            for line in lines:
+                part_file.write(f"{line}\r\n")
+                digest.update(f"{line}\r\n".encode('utf-8'))
+                yield line
+        # Only a response that was read to the end can be saved
+        self.staged = {'etag': etag, 'last_modified': last_modified, 'sha256': digest.hexdigest(), 'settings': self.settings}
+        self.staged_body = True
+
+    def restage(self):
+        """Stage the cached response again, so the current settings are saved with it."""
+        self.staged = dict(self.load_meta(), settings=self.settings)
+        self.staged_body = False
+
+    def save(self):
+        """Replace the cached response with the staged one."""
+        if self.staged is None:
+            return
+        # The body is written first so a crash in between never pairs old validators with a new body
+        if self.staged_body:
+            os.replace(f"{self.body_path}.part", self.body_path)
+        with open(f"{self.meta_path}.tmp", 'w', encoding='utf-8') as meta_file:
+            json.dump(self.staged, meta_file)
+        os.replace(f"{self.meta_path}.tmp", self.meta_path)
+        self.staged = None
+        self.staged_body = False
+
+
+def content_hash(body):
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()
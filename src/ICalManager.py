@@ -1,155 +1,500 @@
 # ICalManager.py
 
+import re
+import json
+import hashlib
+import logging
+import time
 import requests
-from datetime import date
-from icalendar import Calendar
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from icalendar import Calendar, Event
+from src.ColorTable import ColorTable
+from src.EventRecord import EventRecord
+from src.FeedCache import FeedCache
+from src.ParseCache import ParseCache
+from src.SyncMetrics import SyncMetrics
+
+logger = logging.getLogger(__name__)
+
+# Lines stamp_description adds to every description
+DATE_STAMP_PREFIXES = ("Date added:", "Date updated:")
+
+# Defaults for the transform, each can be overridden with a comma-separated profile setting
+COURSE_NAME_LABELS = ('Course name', 'Kursnamn')  # course_name_labels
+ACTIVITY_LABELS = ('Aktivitet',)  # activity_labels
+ACTIVITY_TYPES = ('Laboration', 'Exercise', 'Lecture')  # activity_types
+
+def strip_date_stamps(description):
+    """Return the description without the date stamps added by stamp_description."""
+    lines = str(description or '').split('\n')
+    return '\n'.join(line for line in lines if not line.startswith(DATE_STAMP_PREFIXES)).strip()
+
+
+def unfold_lines(lines):
+    """Join folded iCalendar content lines (RFC 5545, section 3.1) back into single lines."""
+    current = None
+    for line in lines:
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def iter_feed_parts(lines):
+    """Yield each VEVENT as a list of its unfolded content lines, and every other content line as a string."""
+    block = None
+    depth = 0
+    for line in unfold_lines(lines):
+        if block is None:
+            if line.upper() == 'BEGIN:VEVENT':
+                block, depth = [line], 1
+            else:
+                yield line
+            continue
+        block.append(line)
+        # Keep nested components such as VALARM inside their event
+        if line.upper().startswith('BEGIN:'):
+            depth += 1
+        elif line.upper().startswith('END:'):
+            depth -= 1
+            if depth == 0:
+                yield block
+                block = None
+
+
+def iter_vevent_lines(lines):
+    """Yield the unfolded content lines of each VEVENT, one event at a time."""
+    return (part for part in iter_feed_parts(lines) if isinstance(part, list))
+
+
+def vevent_start_date(block):
+    """Return the DTSTART date of a VEVENT's lines as YYYYMMDD, without parsing the event."""
+    for line in block:
+        if line[:7].upper() == 'DTSTART' and line[7:8] in (':', ';'):
+            return line.rpartition(':')[2][:8]
+    return None
+
+
+def is_recurring(block):
+    """Return True for a VEVENT's lines that are a recurring event or an occurrence it overrides."""
+    return any(line[:6].upper() in ('RRULE:', 'RRULE;', 'RDATE:', 'RDATE;') or line[:14].upper() == 'RECURRENCE-ID;'
+               or line[:14].upper() == 'RECURRENCE-ID:' for line in block)
+
+
+def parse_window_bound(value, today=None):
+    """Parse a sync window bound: a date (YYYY-MM-DD), today, yesterday, tomorrow or a number of days from today."""
+    today = today or date.today()
+    value = str(value).strip().lower()
+    relative = {'today': 0, 'yesterday': -1, 'tomorrow': 1}
+    if value in relative:
+        return today + timedelta(days=relative[value])
+    match = re.fullmatch(r'([+-]?\d+)\s*(?:d|days?)?', value)
+    if match:
+        return today + timedelta(days=int(match.group(1)))
+    return date.fromisoformat(value)
+
+
+def feed_urls(config):
+    """Return the profile's iCal feed URLs: ical_urls (separated by spaces or newlines) if set, else ical_url."""
+    return config.get('ical_urls', '').split() or [config.get('ical_url', '')]
+
+
+def feed_cache_name(profile_name, url):
+    """Name the cache of one of a profile's several feeds after its URL, so reordering the feeds keeps the caches."""
+    return f"{profile_name}.{hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]}"
+
+
+def hold_back_series(records):
+    """Yield a feed's records with its recurring events last, each excluding the occurrences the feed overrides.
+
+    The overriding occurrences are synced as events of their own, so their series mustn't repeat them.
+    """
+    series = []
+    overridden = {}
+    for record in records:
+        if record.recurrence_id is not None:
+            overridden.setdefault(record.uid, []).append(record.recurrence_id)
+        if record.recurring:
+            series.append(record)
+        else:
+            yield record
+    for record in series:
+        if record.uid in overridden:
+            record.exdates = record.exdates + tuple(overridden[record.uid])
+        yield record
+
+
+def config_list(config, key, default):
+    value = config.get(key, '')
+    return tuple(item.strip() for item in value.split(',') if item.strip()) if value else default
+
+
+class DuplicateFilter:
+    """Recognises events that an earlier feed already had, by UID or by (transformed) summary and start."""
+
+    def __init__(self):
+        self.seen = set()
+        self.current = set()
+
+    @staticmethod
+    def event_keys(record):
+        keys = [('start', record.summary, record.start)]
+        if record.uid:
+            # The occurrences a recurring event overrides share its UID
+            keys.append(('uid', record.uid, record.recurrence_id))
+        return keys
+
+    def is_duplicate(self, record):
+        keys = self.event_keys(record)
+        if not self.seen.isdisjoint(keys):
+            return True
+        # Events are only compared with other feeds, so nothing in a single feed is ever dropped
+        self.current.update(keys)
+        return False
+
+    def next_feed(self):
+        self.seen |= self.current
+        self.current = set()
+
 
 class ICalManager:
-    def __init__(self, config):
+    def __init__(self, config, skip_unchanged=True, session=None, metrics=None, sync_from=None, sync_to=None,
+                 parse_cache=True, dry_run=False):
         self.config = config
-        self.color_assignments = {}
+        # A dry run assigns colors to new courses without remembering them
+        self.dry_run = dry_run
+        self.metrics = metrics if metrics is not None else SyncMetrics(config.get('config_name', 'default'))
+        self.compile_transform()
+        # Only events starting between these dates are synced; sync_from/sync_to override the profile's settings
+        self.compile_window(sync_from or config.get('sync_from'), sync_to or config.get('sync_to'))
+        # A shared requests.Session lets several profiles reuse the same connections
+        self.session = session if session is not None else requests
+        # Several feeds are fetched in parallel and synced as one, with one set of colors
+        self.urls = feed_urls(config)
+        self.duplicates = DuplicateFilter() if len(self.urls) > 1 else None
+        # The window and settings are remembered with each feed, so a feed that hasn't changed is synced again when
+        # the window moves or the profile is changed
+        profile_name = config.get('config_name', 'default')
+        settings = self.sync_settings()
+        self.feed_caches = [FeedCache(profile_name if len(self.urls) == 1 else feed_cache_name(profile_name, url),
+                                      settings=settings) for url in self.urls]
+        # Return nothing when the server says the feed has not changed since the last sync
+        self.skip_unchanged = skip_unchanged
+        self.not_modified = False
+        # Set when a streamed feed is cut off or an event can't be parsed, so events are missing from the sync
+        self.incomplete = False
+        # Feeds parsed before, by this or another profile, are loaded from the parse cache instead of parsed again
+        self.parse_cache = ParseCache() if parse_cache else None
 
     def run(self):
-        ical_data = self.fetch_ical_data()
-        self.modify_ical_data(ical_data)
-        return ical_data
-
-    def modify_ical_data(self, ical_data):
-        for event in ical_data.walk('vevent'):
-            event = self.extract_activity_from_description(event)
-            event = self.modify_event_summary(event)
-            event = self.modify_event_description(event)
-            event = self.set_event_color_based_on_activity(event)
-
-    def fetch_ical_data(self):
-        try:
-            # Try fetching the data from the URL
-            response = requests.get(self.config['ical_url'], timeout=10)  # 10 seconds timeout
-            
-            # Check if the request was successful (status code 200)
-            response.raise_for_status()
-            
-            # Try parsing the iCalendar data
-            return Calendar.from_ical(response.text)
-            
-        except requests.RequestException as e:
-            print(f"Error fetching data from the URL: {str(e)}")
+        """Fetch and parse the feeds and return their events as transformed EventRecords, in feed order."""
+        texts = self.fetch_ical_data()
+        if texts is None:
             return None
-            
+        records = []
+        try:
+            for ical_text in texts:
+                records.extend(hold_back_series(self.feed_records(ical_text)))
         except Exception as e:
-            print(f"Error parsing the iCalendar data: {str(e)}")
+            logger.error("Error parsing the iCalendar data: %s", e)
             return None
+        return records
 
-    def modify_event_summary(self, event):
-        summary = event.get('summary')
-        course_parts = summary.split(", ")
+    def feed_records(self, ical_text):
+        """Return the records of a feed's events, without the ones an earlier feed already had.
 
-        # Extract the first course code and its corresponding name
-        if '. Course name: ' in course_parts[0]:
-            course_code, course_name = course_parts[0].split('. Course name: ')
-
-            # Add the extracted course code and name to the event object
-            event['course_code'] = course_code  
-            event['course_name'] = course_name
+        A feed that has been parsed with the same settings before is loaded from the parse cache, and its
+        records only need their descriptions stamped and their colors assigned.
+        """
+        key = ParseCache.key(ical_text, self.parse_settings) if self.parse_cache is not None else None
+        records = self.parse_cache.load(key) if key is not None else None
+        if records is None:
+            with self.metrics.timer('parse'):
+                events = self.parse_feed(ical_text).walk('vevent')
+            with self.metrics.timer('transform'):
+                records = [self.read_event(event) for event in events]
+            self.metrics.count('events_parsed', len(records))
+            # Stored before finish_event, whose stamps and colors depend on the day and the calendar's color table
+            if key is not None:
+                self.parse_cache.store(key, records)
+        else:
+            self.metrics.count('parse_cache_hits')
+        with self.metrics.timer('transform'):
+            records = [self.finish_event(record) for record in records]
+        if self.duplicates is not None:
+            records = self.drop_duplicates(records)
+        return records
 
-            # Create a new summary based on the extracted course code and name
-            new_summary = f"{course_name} - {course_code}"
+    # Keep the fetched feeds so the next run can ask the servers whether they have changed
+    def save_feed_cache(self):
+        for feed_cache in self.feed_caches:
+            feed_cache.save()
 
-            # Add the activity type to the summary if it exists
-            activity_type = event.get('activity', None)
-            if activity_type: 
-                new_summary = f"{course_name} - {activity_type} - {course_code}"
+    def drop_duplicates(self, records):
+        kept = []
+        for record in records:
+            if self.duplicates.is_duplicate(record):
+                self.metrics.count('events_duplicate')
             else:
-                new_summary = f"{course_name} - {course_code}"
-        # Check if '. Kursnamn: ' is in the string
-        elif '. Kursnamn: ' in course_parts[0]:
-            course_code, course_name = course_parts[0].split('. Kursnamn: ')
-
-            # Add the extracted course code and name to the event object
-            event['course_code'] = course_code  
-            event['course_name'] = course_name
-
-            # Create a new summary based on the extracted course code and name
-            new_summary = f"{course_name} - {course_code}"
-
-            # Add the activity type to the summary if it exists
-            activity_type = event.get('activity', None)
-            if activity_type: 
-                new_summary = f"{course_name} - {activity_type} - {course_code}"
+                kept.append(record)
+        self.duplicates.next_feed()
+        return kept
+
+    def map_feeds(self, fetch):
+        """Call fetch(url, feed_cache) for every feed, in parallel if there are several, and return the results."""
+        if len(self.urls) == 1:
+            return [fetch(self.urls[0], self.feed_caches[0])]
+        with ThreadPoolExecutor(max_workers=len(self.urls)) as executor:
+            return list(executor.map(fetch, self.urls, self.feed_caches))
+
+    def compile_transform(self):
+        """Precompile everything transform_event needs from the profile, so each event is one pass."""
+        labels = '|'.join(re.escape(label) for label in config_list(self.config, 'course_name_labels', COURSE_NAME_LABELS))
+        # "<course code>. Course name: <course name>" in the first part of the summary
+        self.course_pattern = re.compile(rf'(?P<code>.*?)\. (?:{labels}): (?P<name>.*)', re.DOTALL)
+        labels = '|'.join(re.escape(label) for label in config_list(self.config, 'activity_labels', ACTIVITY_LABELS))
+        # The first word after "Aktivitet: " in the description
+        self.activity_pattern = re.compile(rf'(?:{labels}): \s*(\S+)')
+        self.activity_types = frozenset(config_list(self.config, 'activity_types', ACTIVITY_TYPES))
+        # Everything read_event's records depend on besides the feed, for the parse cache's keys
+        self.parse_settings = {
+            'course_name_labels': config_list(self.config, 'course_name_labels', COURSE_NAME_LABELS),
+            'activity_labels': config_list(self.config, 'activity_labels', ACTIVITY_LABELS),
+            'activity_types': sorted(self.activity_types),
+        }
+
+        # Colors are kept per calendar between runs, so profiles syncing into the same calendar share them
+        self.color_table = ColorTable(self.config.get('calendar_id', ''), config_list(self.config, 'excluded_colors', ()),
+                                      read_only=self.dry_run)
+        self.today = str(date.today())
+
+    def compile_window(self, sync_from, sync_to):
+        """Work out the dates events must start between, as YYYYMMDD strings that DTSTART values compare with."""
+        today = date.today()
+        start = parse_window_bound(sync_from, today).strftime('%Y%m%d') if sync_from else None
+        end = parse_window_bound(sync_to, today).strftime('%Y%m%d') if sync_to else None
+        self.window = (start, end) if start or end else None
+        self.window_key = f"{start or ''}..{end or ''}" if self.window else None
+        # Events outside the window are never parsed, so it shapes the parsed records too
+        self.parse_settings['window'] = self.window_key
+
+    def sync_settings(self):
+        """Return a digest of everything besides the feeds that the synced events depend on."""
+        settings = dict(self.parse_settings, calendar_id=self.config.get('calendar_id', ''),
+                        time_zone=self.config.get('time_zone', ''),
+                        excluded_colors=sorted(config_list(self.config, 'excluded_colors', ())))
+        return hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def window_span(self):
+        """Return the UTC start of the window's first day and the end of its last, either None if open, or None
+        without a window. DTSTART dates are compared as they are written, which for TimeEdit's feeds is in UTC."""
+        if not self.window:
+            return None
+        start, end = self.window
+        return (datetime.strptime(start, '%Y%m%d').replace(tzinfo=timezone.utc) if start else None,
+                datetime.strptime(end, '%Y%m%d').replace(tzinfo=timezone.utc) + timedelta(days=1) if end else None)
+
+    def in_window(self, block):
+        """Return True if a VEVENT's lines start inside the sync window, comparing dates only."""
+        start_date = vevent_start_date(block)
+        # Recurring events may have occurrences in the window whenever they start, and the occurrences they
+        # override are needed to leave them out of their series
+        if start_date is None or is_recurring(block):
+            return True
+        start, end = self.window
+        return (start is None or start_date >= start) and (end is None or start_date <= end)
+
+    def iter_windowed_lines(self, lines):
+        """Yield the content lines of a feed without the events that start outside the sync window."""
+        for part in iter_feed_parts(lines):
+            if not isinstance(part, list):
+                yield part
+            elif self.in_window(part):
+                yield from part
             else:
-                new_summary = f"{course_name} - {course_code}"
-        else: # Use the first part as-is if it doesn't match the expected format
-            new_summary = course_parts[0]  
+                self.metrics.count('events_outside_window')
 
-        # Update the event's summary
-        event['summary'] = new_summary
+    def transform_event(self, event):
+        """Build the event's record, extracting the course and activity, rewriting the summary and description
+        and assigning a color."""
+        return self.finish_event(self.read_event(event))
 
-        return event
+    def read_event(self, event):
+        """Build the event's record, extracting the course and activity and rewriting the summary."""
+        record = EventRecord.from_vevent(event)
 
-    def modify_event_description(self, event):
-        description = event.get('description', '')
+        match = self.activity_pattern.search(record.description)
+        if match and match.group(1) in self.activity_types:
+            record.activity = match.group(1)
 
+        # Only the first of several comma-separated courses is used
+        first_course = record.summary.partition(", ")[0]
+        match = self.course_pattern.fullmatch(first_course)
+        if match:
+            record.course_code, record.course_name = match.group('code', 'name')
+            if record.activity:
+                record.summary = f"{record.course_name} - {record.activity} - {record.course_code}"
+            else:
+                record.summary = f"{record.course_name} - {record.course_code}"
+        else:  # Use the first part as-is if it doesn't match the expected format
+            record.summary = first_course
+        return record
+
+    def finish_event(self, record):
+        """Stamp the description of a record built by read_event and assign its color."""
+        record.description = self.stamp_description(record.description)
+
+        # Every combination of course and activity gets its own color, for as long as there are colors left
+        record.color_id = self.color_table.color_for(record.course_code, record.activity)
+        return record
+
+    def stamp_description(self, description):
         # Check if "Date added" is already in the description
         if "Date added:" not in description:
             # This is the first edit, so we add the date added.
-            description = f"Date added: {date.today()}"
-        else:
-            # Remove any existing "Date updated" from the description
-            description = description.replace(
-                next((line for line in description.split('\n') if "Date updated:" in line), ''), ''
-            ).strip()
-            # Append the updated date
-            description += f"\nDate updated: {date.today()}"
+            return f"Date added: {self.today}"
+        # Remove any existing "Date updated" from the description and append today's
+        updated_line = next((line for line in description.split('\n') if "Date updated:" in line), '')
+        return f"{description.replace(updated_line, '').strip()}\nDate updated: {self.today}"
 
-        event['description'] = description
-        return event
+    def stream_events(self):
+        """Request the feeds and return an iterator that parses and transforms them one event at a time.
 
+        Returns None if a feed could not be fetched, or none has changed and skip_unchanged is set.
+        """
+        try:
+            with self.metrics.timer('fetch'):
+                responses = self.map_feeds(self.open_feed)
+        except requests.RequestException as e:
+            logger.error("Error fetching data from the URL: %s", e)
+            return None
 
-    def set_event_color_based_on_activity(self, event):
-        self.color_assignments
+        if all(response is None for response in responses):
+            self.not_modified = True
+            if self.skip_unchanged and not any(feed_cache.settings_changed() for feed_cache in self.feed_caches):
+                return None
+        # The feeds are read one after another, the first feed's events first
+        feeds = []
+        for response, feed_cache in zip(responses, self.feed_caches):
+            if response is None:
+                feed_cache.restage()
+                feeds.append(feed_cache.iter_body_lines())
+            else:
+                feeds.append(feed_cache.stage_lines(self.decode_lines(response), response.headers.get('ETag'),
+                                                    response.headers.get('Last-Modified')))
+        return self.iter_transformed_events(feeds)
 
-        course_code = event.get('course_code')
-        activity = event.get('activity')
+    def open_feed(self, url, feed_cache):
+        """Request a feed without reading its body, returning None if the server says it has not changed."""
+        response = self.session.get(url, headers=feed_cache.request_headers(), timeout=10, stream=True)
+        if response.status_code == 304:
+            response.close()
+            self.metrics.count('feed_not_modified')
+            return None
+        response.raise_for_status()
+        return response
 
-        # If this combination of course_code and activity has been seen before, use the assigned color
-        if (course_code, activity) in self.color_assignments:
-            event['colorId'] = self.color_assignments[(course_code, activity)]
-            return event
+    def decode_lines(self, response):
+        for line in response.iter_lines(chunk_size=64 * 1024):
+            # iter_lines yields an empty line when a chunk ends between the CR and the LF of a line ending,
+            # which would end a folded line early. Content lines are never empty, so empty lines are dropped
+            if not line:
+                continue
+            # iter_lines drops the CRLF that ends every iCalendar line
+            self.metrics.count('bytes_downloaded', len(line) + 2)
+            yield line.decode('utf-8')
 
-        # If this combination is new, assign a new color
-        available_colors = ["1", "2", "3", "4", "5", "6", "7", "8", "9", "10", "11"]
+    def iter_transformed_events(self, feeds):
+        try:
+            for lines in feeds:
+                # A feed's recurring events come last, once all of the occurrences it overrides are known
+                yield from hold_back_series(self.iter_feed_records(lines))
+                if self.duplicates is not None:
+                    self.duplicates.next_feed()
+        except requests.RequestException as e:
+            logger.error("Error fetching data from the URL: %s", e)
+            self.incomplete = True
 
+    def iter_feed_records(self, lines):
+        metrics = self.metrics
+        for block in iter_vevent_lines(lines):
+            # Events outside the window are dropped before they are parsed
+            if self.window and not self.in_window(block):
+                metrics.count('events_outside_window')
+                continue
+            start = time.perf_counter()
+            try:
+                event = Event.from_ical('\r\n'.join(block))
+            except ValueError as e:
+                logger.error("Error parsing an event in the iCalendar data: %s", e)
+                self.incomplete = True
+                continue
+            parsed = time.perf_counter()
+            record = self.transform_event(event)
+            metrics.add_time('parse', parsed - start)
+            metrics.add_time('transform', time.perf_counter() - parsed)
+            metrics.count('events_parsed')
+            if self.duplicates is not None and self.duplicates.is_duplicate(record):
+                metrics.count('events_duplicate')
+                continue
+            yield record
+
+    def fetch_ical_data(self):
+        """Fetch the feeds, returning the text of each, or None if none of them has changed."""
         try:
-            # Convert the comma-separated string to a list
-            excluded_colors = self.config.get('excluded_colors', '').split(',')
-            if '' in excluded_colors:  # Handle the case where there's no excluded color
-                excluded_colors.remove('')
+            # Try fetching the data from the URLs, unless it hasn't changed since the last sync
+            with self.metrics.timer('fetch'):
+                texts = self.map_feeds(self.fetch_feed)
+            if self.skip_unchanged and self.feeds_unchanged(texts):
+                return None
+            for position, feed_cache in enumerate(self.feed_caches):
+                if texts[position] is None:
+                    texts[position] = feed_cache.read_body()
+                    feed_cache.restage()
+            return texts
 
-            # Exclude colors based on user's choice
-            available_colors = [color for color in available_colors if color not in excluded_colors]
-        except Exception as e:
-            print(f"Error processing excluded colors: {e}. Using all available colors.")
-        for color in available_colors:
-            if color not in self.color_assignments.values():
-                event['colorId'] = color
-                self.color_assignments[(course_code, activity)] = color
-                break
-
-        return event
-
-    def extract_activity_from_description(self, event):
-        description = event.get('description')
-
-        # Look for the "Aktivitet: " field in the description
-        activity_prefix = "Aktivitet: "
-        if activity_prefix in description:
-            # Split the description based on the activity prefix and take the second part
-            # Taking the first word after "Aktivitet: "
-            activity = description.split(activity_prefix)[1].strip().split()[0]  
-
-            # Check if the activity is one of the expected types
-            if activity in ["Laboration", "Exercise", "Lecture"]:
-                event['activity'] = activity  # Add the extracted activity to the event object
-
-        # Return the modified event object
-        return event
\ No newline at end of file
+        except requests.RequestException as e:
+            logger.error("Error fetching data from the URL: %s", e)
+            return None
+
+        except OSError as e:
+            logger.error("Error reading the cached iCal feed: %s", e)
+            return None
+
+    def fetch_feed(self, url, feed_cache):
+        """Request a feed and return its text, or None if the server says it has not changed."""
+        response = self.session.get(url, headers=feed_cache.request_headers(), timeout=10)  # 10 seconds timeout
+        if response.status_code == 304:
+            self.metrics.count('feed_not_modified')
+            return None
+        # Check if the request was successful (status code 200)
+        response.raise_for_status()
+        ical_text = response.text
+        self.metrics.count('bytes_downloaded', len(response.content))
+        feed_cache.stage(ical_text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return ical_text
+
+    def feeds_unchanged(self, texts):
+        """Return True if no feed has changed since the last sync with the same window and settings, saving the
+        feeds' caches."""
+        # Servers without ETag/Last-Modified send the whole feed every time, so compare the content
+        if not all(feed_cache.matches(ical_text) if ical_text is not None else not feed_cache.settings_changed()
+                   for ical_text, feed_cache in zip(texts, self.feed_caches)):
+            return False
+        for ical_text, feed_cache in zip(texts, self.feed_caches):
+            if ical_text is not None:
+                feed_cache.save()
+                self.metrics.count('feed_unchanged')
+        self.not_modified = True
+        return True
+
+    def parse_feed(self, ical_text):
+        if self.window:
+            # Events outside the window are dropped before they are parsed
+            ical_text = '\r\n'.join(self.iter_windowed_lines(ical_text.splitlines()))
+        return Calendar.from_ical(ical_text)
@@ -0,0 +1,94 @@
+# ParseCache.py
+
+import os
+import json
+import pickle
+import hashlib
+import logging
+import threading
+
+CACHE_DIR = 'config/cache/parsed'
+# Total size of the cached feeds, shared by every profile, before the least recently used ones are evicted
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+# Bump when EventRecord or the transform changes, so records cached by an older version are never loaded
+CACHE_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+class ParseCache:
+    """The parsed EventRecords of feeds, keyed by the feed's content and the settings they were parsed with.
+
+    Profiles that sync the same feed share its entry. Every hit marks the entry as used, and once the cache
+    grows beyond max_bytes the entries that were used longest ago are removed.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(body, settings):
+        """Return the cache key of a feed's text parsed with the given settings, which must be JSON serialisable."""
+        digest = hashlib.sha256(json.dumps([CACHE_VERSION, settings], sort_keys=True).encode('utf-8'))
+        digest.update(body.encode('utf-8'))
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pickle")
+
+    def load(self, key):
+        """Return the records cached under key, or None if there are none."""
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as cache_file:
+                records = pickle.load(cache_file)
+            # The modification time is when the entry was last used
+            os.utime(path)
+            return records
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # A truncated or outdated entry is parsed again and replaced
+            logger.debug("Could not load the parsed feed %s: %s", key, e)
+            return None
+
+    def store(self, key, records):
+        path = self.path(key)
+        # Profiles synced in parallel may store the same feed at once, so each writes its own temporary file
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporary_path, 'wb') as cache_file:
+                pickle.dump(records, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, path)
+        except Exception as e:
+            # e.g. a time zone of the feed's own that can't be pickled, the feed is then parsed every time
+            logger.debug("Could not cache the parsed feed %s: %s", key, e)
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
+            return
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith('.pickle'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:  # Evicted by another profile meanwhile
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,146 @@
+# RequestExecutor.py
+
+import json
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+import httplib2
+from googleapiclient.errors import HttpError
+from src.SyncMetrics import SyncMetrics
+
+# Errors that are worth sending again
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+
+def error_reasons(exception):
+    try:
+        errors = json.loads(exception.content.decode('utf-8'))['error'].get('errors', [])
+    except (ValueError, KeyError, AttributeError, TypeError):
+        return []
+    return [error.get('reason') for error in errors]
+
+
+def is_rate_limited(exception):
+    """Return True if Google rejected a call because a quota was used up too fast."""
+    if not isinstance(exception, HttpError):
+        return False
+    status = int(exception.resp.status)
+    return status == 429 or (status == 403 and any(reason in RATE_LIMIT_REASONS for reason in error_reasons(exception)))
+
+
+def is_retryable(exception):
+    """Return True if a failed API call may succeed when sent again."""
+    if not isinstance(exception, HttpError):
+        # Transport errors (timeouts, dropped connections) are transient
+        return isinstance(exception, (OSError, httplib2.HttpLib2Error))
+    return int(exception.resp.status) in RETRYABLE_STATUS_CODES or is_rate_limited(exception)
+
+
+def is_missing(exception):
+    """Return True if a call failed because the event doesn't exist (anymore)."""
+    return isinstance(exception, HttpError) and int(exception.resp.status) in (404, 410)
+
+
+def retry_after(exception):
+    """Return the number of seconds the server asked us to wait, if it did."""
+    resp = getattr(exception, 'resp', None)
+    value = resp.get('retry-after') if resp is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestExecutor:
+    def __init__(self, rate=10.0, burst=10, max_retries=5, base_delay=1.0, max_delay=64.0, metrics=None):
+        # Token bucket: up to `burst` calls at once, refilled at `rate` calls per second
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.slowed_down = None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        # API calls, retries and time spent waiting are counted here
+        self.metrics = metrics if metrics is not None else SyncMetrics()
+
+    @classmethod
+    def from_config(cls, config, metrics=None):
+        """Create an executor from a profile's api_rate, api_burst and api_max_retries settings."""
+        return cls(rate=float(config.get('api_rate', '10')),
+                   burst=int(config.get('api_burst', '10')),
+                   max_retries=int(config.get('api_max_retries', '5')),
+                   metrics=metrics)
+
+    def acquire(self, count=1):
+        """Block until `count` calls may be sent without going over the current rate."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                # Calls larger than the bucket (big batches) go through once it is full
+                needed = min(count, self.burst)
+                if self.tokens >= needed:
+                    self.tokens -= count
+                    return
+                wait = (needed - self.tokens) / self.rate
+            self.metrics.add_time('throttled', wait)
+            time.sleep(wait)
+
+    def record_success(self):
+        # Creep back up towards the configured rate after being slowed down
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 50)
+
+    def record_rate_limit(self):
+        # Halve the rate when Google says we are going too fast, but only once per second,
+        # since a whole batch of calls tends to be rejected at the same time
+        self.metrics.count('api_rate_limited')
+        with self.lock:
+            now = time.monotonic()
+            if self.slowed_down is None or now - self.slowed_down >= 1.0:
+                self.rate = max(self.max_rate / 64, self.rate / 2)
+                self.slowed_down = now
+
+    def retry_delay(self, attempt, exception=None):
+        """Return how long to wait before retry number `attempt` (starting at 1)."""
+        requested = retry_after(exception) if exception is not None else None
+        if requested is not None:
+            return min(requested, self.max_delay)
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        # Jitter keeps many clients that failed at the same time from retrying at the same time
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def execute(self, request):
+        """Execute an API request, waiting for the rate limiter and retrying transient errors."""
+        attempt = 0
+        while True:
+            self.acquire()
+            self.metrics.count_api_call(request)
+            try:
+                response = request.execute()
+            except Exception as e:
+                if is_rate_limited(e):
+                    self.record_rate_limit()
+                attempt += 1
+                if not is_retryable(e) or attempt > self.max_retries:
+                    raise
+                delay = self.retry_delay(attempt, e)
+                self.metrics.count('api_retries')
+                self.metrics.add_time('backoff', delay)
+                time.sleep(delay)
+                continue
+            self.record_success()
+            return response
@@ -0,0 +1,63 @@
+# SyncDaemon.py
+
+import time
+import logging
+import heapq
+import random
+import signal
+import threading
+import requests
+from src.get_calendar_service import get_calendar_service, get_credentials
+
+logger = logging.getLogger(__name__)
+
+
+class SyncDaemon:
+    def __init__(self, configs, runner, interval=900, jitter=0.1):
+        self.configs = configs
+        self.runner = runner
+        # Seconds between polls, unless a profile sets its own poll_interval
+        self.interval = interval
+        # Spread polls by up to this fraction of the interval, so profiles don't all poll at once
+        self.jitter = jitter
+        self.stop_event = threading.Event()
+
+    def poll_interval(self, config):
+        interval = float(config.get('poll_interval', self.interval))
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def stop(self, signum=None, frame=None):
+        logger.info("Stopping after the current sync...")
+        self.stop_event.set()
+
+    def run(self):
+        """Poll every profile's feed on its own interval until stopped with SIGINT or SIGTERM."""
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        # The service and HTTP connections are built once and kept warm between polls
+        creds = get_credentials()
+        service = get_calendar_service(creds) if creds else None
+        if service is None:
+            logger.error("Google Calendar service is not initialized.")
+            return
+
+        # (next poll time, position, config), with the first polls spread over the jitter window
+        now = time.monotonic()
+        schedule = [(now + random.uniform(0, self.jitter * self.interval), position, config)
+                    for position, config in enumerate(self.configs)]
+        heapq.heapify(schedule)
+
+        with requests.Session() as session:
+            while schedule and not self.stop_event.is_set():
+                due, position, config = heapq.heappop(schedule)
+                if self.stop_event.wait(max(0.0, due - time.monotonic())):
+                    break
+                try:
+                    # The runner logs a summary of every sync
+                    self.runner.sync_profile(config, service, session)
+                except Exception as e:
+                    # Keep polling the other profiles, and this one again on its next turn
+                    logger.error("Error syncing %s: %s", config.get('config_name', 'default'), e)
+                heapq.heappush(schedule, (time.monotonic() + self.poll_interval(config), position, config))
+        logger.info("Daemon stopped.")
@@ -0,0 +1,110 @@
+# SyncMetrics.py
+
+import os
+import json
+import time
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from src.ConfigManager import safe_file_name
+
+# Prefix of every metric in the Prometheus text file
+METRIC_PREFIX = 'timeeditarc'
+
+
+class SyncMetrics:
+    def __init__(self, profile_name='default'):
+        self.profile_name = profile_name
+        self.started = time.time()
+        self.status = None
+        # Seconds spent in each phase of the sync, summed over every time the phase ran
+        self.timings = defaultdict(float)
+        self.counters = Counter()
+        # Google Calendar API calls by method, e.g. calendar.events.list
+        self.api_calls = Counter()
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, phase):
+        """Add the time spent in the with block to a phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - start)
+
+    def add_time(self, phase, seconds):
+        with self.lock:
+            self.timings[phase] += seconds
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def count_api_call(self, request):
+        method = getattr(request, 'methodId', None) or 'unknown'
+        with self.lock:
+            self.api_calls[method] += 1
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'timestamp': round(self.started, 3),
+                'profile': self.profile_name,
+                'status': self.status,
+                'seconds': {phase: round(seconds, 6) for phase, seconds in sorted(self.timings.items())},
+                'counters': dict(sorted(self.counters.items())),
+                'api_calls': dict(sorted(self.api_calls.items())),
+            }
+
+
+def append_json_line(path, metrics):
+    """Append the metrics of one run to a JSON lines file, or print them if path is '-'."""
+    line = json.dumps(metrics.to_dict(), ensure_ascii=False)
+    if path == '-':
+        print(line)
+        return
+    with open(path, 'a', encoding='utf-8') as metrics_file:
+        metrics_file.write(line + '\n')
+
+
+def prometheus_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_textfile_path(path, profile_name):
+    """Return the file a profile's metrics are written to, path with the profile's name added before the extension.
+
+    Every profile has a file of its own, so runs that sync different profiles don't replace each other's metrics.
+    """
+    base, extension = os.path.splitext(path)
+    return f"{base}_{safe_file_name(profile_name)}{extension}"
+
+
+def write_prometheus_textfile(path, all_metrics):
+    """Write the latest metrics of the given profiles in the Prometheus text format, for node_exporter's textfile
+    collector."""
+    series = defaultdict(list)
+    for metrics in all_metrics:
+        data = metrics.to_dict()
+        profile = f'profile="{prometheus_label(data["profile"])}"'
+        series['last_sync_timestamp_seconds'].append((profile, data['timestamp']))
+        series['last_sync_success'].append((profile, int(data['status'] in ('synced', 'unchanged', 'planned'))))
+        for phase, seconds in data['seconds'].items():
+            series['phase_seconds'].append((f'{profile},phase="{prometheus_label(phase)}"', seconds))
+        for name, value in data['counters'].items():
+            series[name].append((profile, value))
+        for method, calls in data['api_calls'].items():
+            series['api_calls'].append((f'{profile},method="{prometheus_label(method)}"', calls))
+
+    lines = []
+    for name, samples in sorted(series.items()):
+        # Every value describes the last run, so they are all gauges
+        lines.append(f"# TYPE {METRIC_PREFIX}_{name} gauge")
+        lines.extend(f"{METRIC_PREFIX}_{name}{{{labels}}} {value}" for labels, value in samples)
+
+    # node_exporter may read the file at any time, so replace it in one go
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as metrics_file:
+        metrics_file.write('\n'.join(lines) + '\n')
+    os.replace(temp_path, path)
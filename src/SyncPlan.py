@@ -0,0 +1,63 @@
+# SyncPlan.py
+
+import json
+import datetime
+
+# Actions a planned item can have
+CREATE = 'create'
+UPDATE = 'update'
+UNCHANGED = 'unchanged'
+SKIP = 'skip'
+DELETE = 'delete'
+
+
+class SyncPlan:
+    def __init__(self, config_name=None, calendar_id=None):
+        self.config_name = config_name
+        self.calendar_id = calendar_id
+        self.created = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        self.items = []
+
+    def add(self, action, summary, event_id=None, body=None, changes=None, uid=None, content_hash=None):
+        """Record what should happen to one event and return the planned item."""
+        item = {
+            'action': action,
+            'summary': summary,
+            'uid': uid,
+            'event_id': event_id,
+            'content_hash': content_hash,
+            'body': body,
+            'changes': changes or {},
+        }
+        self.items.append(item)
+        return item
+
+    def count(self, action):
+        return sum(1 for item in self.items if item['action'] == action)
+
+    def counts(self):
+        return {action: self.count(action) for action in (CREATE, UPDATE, UNCHANGED, SKIP, DELETE)}
+
+    def summary(self):
+        return ", ".join(f"{count} {action}" for action, count in self.counts().items())
+
+    def save(self, path):
+        """Write the plan as JSON, so it can be reviewed or applied later with load."""
+        plan = {
+            'config_name': self.config_name,
+            'calendar_id': self.calendar_id,
+            'created': self.created,
+            'summary': self.counts(),
+            'items': self.items,
+        }
+        with open(path, 'w', encoding='utf-8') as plan_file:
+            json.dump(plan, plan_file, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as plan_file:
+            data = json.load(plan_file)
+        plan = cls(data.get('config_name'), data.get('calendar_id'))
+        plan.created = data.get('created', plan.created)
+        plan.items = data.get('items', [])
+        return plan
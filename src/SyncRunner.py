@@ -0,0 +1,233 @@
+# SyncRunner.py
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from src.CalendarManager import CalendarManager
+from src.ICalManager import ICalManager
+from src.SyncMetrics import SyncMetrics, append_json_line, prometheus_textfile_path, write_prometheus_textfile
+from src.get_calendar_service import get_calendar_service, get_credentials
+
+logger = logging.getLogger(__name__)
+
+
+class SyncRunner:
+    def __init__(self, only_update_existing_events=False, prefetch=True, batch_size=50, force=False, stream=False,
+                 incremental=False, dry_run=False, plan_out=None, metrics_out=None, prometheus_out=None,
+                 reconcile=False, sync_from=None, sync_to=None, concurrency=0, service_factory=None):
+        self.only_update_existing_events = only_update_existing_events
+        self.prefetch = prefetch
+        self.incremental = incremental
+        self.batch_size = batch_size
+        self.force = force
+        self.stream = stream
+        # Delete the events this tool created that are no longer in the feed
+        self.reconcile = reconcile
+        # Sync window for every profile, overriding their sync_from and sync_to settings
+        self.sync_from = sync_from
+        self.sync_to = sync_to
+        # Number of events synced at the same time by the async engine, 0 to sync one event at a time
+        self.concurrency = concurrency
+        # Builds the Calendar service of each of the engine's threads, get_calendar_service by default
+        self.service_factory = service_factory
+        # Only plan the sync, optionally writing the plan to plan_out ("{profile}" is replaced by the profile name)
+        self.dry_run = dry_run
+        self.plan_out = plan_out
+        # Where to append the metrics of every run as JSON lines, and write them for Prometheus (one file per profile)
+        self.metrics_out = metrics_out
+        self.prometheus_out = prometheus_out
+        self.metrics_lock = threading.Lock()
+
+    def sync_profile(self, config, service=None, session=None):
+        """Sync one profile's iCal feed into its Google Calendar and return a summary of the run."""
+        metrics = SyncMetrics(config.get('config_name', 'default'))
+        result = None
+        try:
+            with metrics.timer('total'):
+                result = self.run_sync(config, service, session, metrics)
+            return result
+        finally:
+            metrics.status = result['status'] if result else 'failed'
+            self.report_metrics(metrics)
+            self.log_summary(metrics, result)
+
+    def run_sync(self, config, service, session, metrics):
+        result = {'profile': config.get('config_name', 'default'), 'status': 'synced', 'plan': ''}
+        # A dry run plans against the full feed, even if it hasn't changed since the last sync
+        ical_manager = ICalManager(config, skip_unchanged=not (self.force or self.dry_run), session=session,
+                                   metrics=metrics, sync_from=self.sync_from, sync_to=self.sync_to,
+                                   dry_run=self.dry_run)
+        # EventRecords, streamed or in a list
+        events = ical_manager.stream_events() if self.stream else ical_manager.run()
+        if events is None:
+            if ical_manager.not_modified:
+                logger.info("The iCal feed has not changed since the last sync. Nothing to do.")
+                result['status'] = 'unchanged'
+            else:
+                result['status'] = 'failed'
+                result['error'] = "Could not fetch or parse the iCal feed."
+            return result
+
+        calendar_manager = CalendarManager(config, service, dry_run=self.dry_run, metrics=metrics,
+                                           window=ical_manager.window_span())
+        if not (self.incremental and self.sync_calendar_mirror(calendar_manager)):
+            self.prefetch_calendar(calendar_manager, events)
+        if self.batch_size > 0:
+            calendar_manager.start_batch(self.batch_size)
+        if self.concurrency > 0:
+            # asyncio is only imported when it is used, it adds noticeably to every cron run's startup
+            from src.AsyncSyncEngine import AsyncSyncEngine
+            AsyncSyncEngine(calendar_manager, self.concurrency, self.service_factory).run(
+                events, self.only_update_existing_events)
+        else:
+            for event in events:
+                calendar_manager.create_or_update_event(event, self.only_update_existing_events)
+
+        # Events missing from a feed that wasn't read in full must not be deleted
+        feed_complete = not ical_manager.incomplete
+        if self.dry_run:
+            if self.reconcile and feed_complete:
+                calendar_manager.reconcile()
+            self.record_plan(result, calendar_manager.plan, metrics)
+            result['status'] = 'planned'
+            if self.plan_out:
+                path = self.plan_out.format(profile=result['profile'])
+                calendar_manager.plan.save(path)
+                logger.info("The sync plan has been written to %s.", path)
+            return result
+
+        all_written = calendar_manager.flush_batch()
+        # Only delete once every create and update went through, so nothing that is still in the feed goes
+        if all_written and feed_complete and self.reconcile:
+            calendar_manager.reconcile()
+            all_written = calendar_manager.flush_batch()
+        self.record_plan(result, calendar_manager.plan, metrics)
+        calendar_manager.save_state()
+        # Only remember the feed once it has been fully synced, so failed writes are retried next run
+        if not feed_complete:
+            result['status'] = 'failed'
+            result['error'] = "The iCal feed could not be read in full."
+        elif all_written:
+            ical_manager.save_feed_cache()
+        else:
+            result['status'] = 'failed'
+            result['error'] = "Some events could not be synced."
+        return result
+
+    @staticmethod
+    def record_plan(result, plan, metrics):
+        result['plan'] = plan.summary()
+        for action, count in plan.counts().items():
+            metrics.count(f'events_{action}', count)
+
+    def apply_plan(self, config, plan, service=None):
+        """Execute a plan saved by a dry run and return a summary like sync_profile does."""
+        result = {'profile': config.get('config_name', 'default'), 'status': 'synced', 'plan': plan.summary()}
+        # The plan's event IDs only exist in the calendar it was made for
+        if plan.calendar_id != config.get('calendar_id'):
+            result['status'] = 'failed'
+            result['error'] = (f"The plan was made for calendar {plan.calendar_id}, "
+                               f"not {config.get('calendar_id')}. Nothing was applied.")
+            logger.error("Not applying the sync plan to %s: %s", result['profile'], result['error'])
+            return result
+        metrics = SyncMetrics(result['profile'])
+        with metrics.timer('total'):
+            calendar_manager = CalendarManager(config, service, metrics=metrics)
+            if self.batch_size > 0:
+                calendar_manager.start_batch(self.batch_size)
+            calendar_manager.apply_plan(plan)
+            if not calendar_manager.flush_batch():
+                result['status'] = 'failed'
+                result['error'] = "Some events could not be synced."
+            calendar_manager.save_state()
+        metrics.status = result['status']
+        self.report_metrics(metrics)
+        self.log_summary(metrics, result)
+        return result
+
+    @staticmethod
+    def log_summary(metrics, result):
+        """Log one line per run, with the run's metrics attached for the JSON log."""
+        data = metrics.to_dict()
+        level = logging.WARNING if data['status'] == 'failed' else logging.INFO
+        message = "Sync of %s %s in %.2fs with %d API call(s)"
+        args = [data['profile'], data['status'], data['seconds'].get('total', 0.0), sum(data['api_calls'].values())]
+        if result and result.get('plan'):
+            message += ": %s"
+            args.append(result['plan'])
+        if result and result.get('error'):
+            message += " - %s"
+            args.append(result['error'])
+        logger.log(level, message, *args, extra={'sync': data})
+
+    def report_metrics(self, metrics):
+        if not (self.metrics_out or self.prometheus_out):
+            return
+        # Several profiles may finish at the same time
+        with self.metrics_lock:
+            try:
+                if self.metrics_out:
+                    append_json_line(self.metrics_out, metrics)
+                if self.prometheus_out:
+                    write_prometheus_textfile(prometheus_textfile_path(self.prometheus_out, metrics.profile_name),
+                                              [metrics])
+            except OSError as e:
+                logger.error("Error writing metrics: %s", e)
+
+    def prefetch_calendar(self, calendar_manager, events):
+        if self.prefetch and self.stream:
+            # The span of a streamed feed isn't known up front, so fetch the calendar as events come in
+            calendar_manager.start_lazy_prefetch()
+        elif self.prefetch:
+            # Fetch the target calendar once so events can be matched locally
+            calendar_manager.prefetch_events(events)
+
+    def sync_calendar_mirror(self, calendar_manager):
+        """Match against the incrementally synced calendar mirror, returning False if it couldn't be updated."""
+        try:
+            calendar_manager.incremental_sync()
+            return True
+        except Exception as e:
+            logger.warning("Error syncing the calendar incrementally: %s", e)
+            return False
+
+    def sync_profiles(self, configs, workers=4):
+        """Sync several profiles concurrently, sharing one set of credentials and HTTP connection pool."""
+        creds = get_credentials()
+        if creds is None:
+            logger.error("Could not load Google Calendar credentials.")
+            return []
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        def sync(config):
+            started = time.monotonic()
+            try:
+                # Services are cached per thread, so each worker builds one and reuses it
+                result = self.sync_profile(config, get_calendar_service(creds), session)
+            except Exception as e:
+                # One broken profile must not stop the others
+                result = {'profile': config.get('config_name', 'default'), 'status': 'failed', 'plan': '',
+                          'error': str(e)}
+            result['seconds'] = round(time.monotonic() - started, 2)
+            return result
+
+        with session, ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            return list(executor.map(sync, configs))
+
+
+def log_summaries(results):
+    logger.info("Profile summary:")
+    for result in results:
+        line = f"- {result['profile']}: {result['status']} in {result['seconds']}s"
+        if result['plan']:
+            line += f" ({result['plan']})"
+        if result.get('error'):
+            line += f" - {result['error']}"
+        logger.log(logging.WARNING if result['status'] == 'failed' else logging.INFO, line)
@@ -0,0 +1,107 @@
+# SyncStateManager.py
+
+import os
+import json
+import sqlite3
+import threading
+import datetime
+from src.ConfigManager import safe_file_name
+
+STATE_DIR = 'config/state'
+
+
+class SyncStateManager:
+    def __init__(self, profile_name, state_dir=STATE_DIR):
+        os.makedirs(state_dir, exist_ok=True)
+        self.path = os.path.join(state_dir, f"{safe_file_name(profile_name)}.sqlite3")
+        # The connection is shared by the threads of a concurrent sync, one statement at a time
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.lock = threading.Lock()
+        # Synced events used to be kept by UID alone, so which calendar they were synced to is unknown. They are
+        # dropped, and the next sync matches its events against the calendar again
+        columns = [column[1] for column in self.connection.execute("PRAGMA table_info(synced_events)")]
+        if columns and 'calendar_id' not in columns:
+            self.connection.execute("DROP TABLE synced_events")
+        # Which Google event each iCal UID was synced to, per calendar, since a profile's calendar can change
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS synced_events (
+                calendar_id TEXT NOT NULL,
+                uid TEXT NOT NULL,
+                event_id TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                last_synced TEXT NOT NULL,
+                PRIMARY KEY (calendar_id, uid)
+            )""")
+        # Local mirror of the target calendar, kept up to date with the Calendar API's sync tokens
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS calendar_sync (
+                calendar_id TEXT PRIMARY KEY,
+                sync_token TEXT
+            )""")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS calendar_events (
+                calendar_id TEXT NOT NULL,
+                event_id TEXT NOT NULL,
+                event TEXT NOT NULL,
+                PRIMARY KEY (calendar_id, event_id)
+            )""")
+
+    def execute(self, sql, parameters=()):
+        """Run one statement and return its rows, one thread at a time."""
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def get(self, calendar_id, uid):
+        """Return (event_id, content_hash) for an iCal UID, or None if it has not been synced to the calendar."""
+        rows = self.execute("SELECT event_id, content_hash FROM synced_events WHERE calendar_id = ? AND uid = ?",
+                            (calendar_id, uid))
+        return rows[0] if rows else None
+
+    def put(self, calendar_id, uid, event_id, content_hash):
+        """Remember which Google event in the calendar an iCal UID was synced to."""
+        self.execute(
+            "INSERT OR REPLACE INTO synced_events (calendar_id, uid, event_id, content_hash, last_synced) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (calendar_id, uid, event_id, content_hash, datetime.datetime.now(datetime.timezone.utc).isoformat()))
+
+    def forget(self, calendar_id, uid):
+        self.execute("DELETE FROM synced_events WHERE calendar_id = ? AND uid = ?", (calendar_id, uid))
+
+    def forget_event(self, calendar_id, event_id):
+        """Forget every UID synced to a Google event, e.g. once the event has been deleted."""
+        self.execute("DELETE FROM synced_events WHERE calendar_id = ? AND event_id = ?", (calendar_id, event_id))
+
+    def get_sync_token(self, calendar_id):
+        rows = self.execute("SELECT sync_token FROM calendar_sync WHERE calendar_id = ?", (calendar_id,))
+        return rows[0][0] if rows else None
+
+    def set_sync_token(self, calendar_id, sync_token):
+        self.execute(
+            "INSERT OR REPLACE INTO calendar_sync (calendar_id, sync_token) VALUES (?, ?)", (calendar_id, sync_token))
+
+    def put_mirror_event(self, calendar_id, event):
+        self.execute(
+            "INSERT OR REPLACE INTO calendar_events (calendar_id, event_id, event) VALUES (?, ?, ?)",
+            (calendar_id, event['id'], json.dumps(event)))
+
+    def remove_mirror_event(self, calendar_id, event_id):
+        self.execute(
+            "DELETE FROM calendar_events WHERE calendar_id = ? AND event_id = ?", (calendar_id, event_id))
+
+    def clear_mirror(self, calendar_id):
+        """Forget the mirrored calendar and its sync token, so the next sync is a full one."""
+        self.execute("DELETE FROM calendar_events WHERE calendar_id = ?", (calendar_id,))
+        self.execute("DELETE FROM calendar_sync WHERE calendar_id = ?", (calendar_id,))
+
+    def iter_mirror_events(self, calendar_id):
+        for (event,) in self.connection.execute(
+                "SELECT event FROM calendar_events WHERE calendar_id = ?", (calendar_id,)):
+            yield json.loads(event)
+
+    def save(self):
+        with self.lock:
+            self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
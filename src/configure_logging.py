@@ -0,0 +1,34 @@
+# configure_logging.py
+
+import sys
+import json
+import logging
+
+TEXT_FORMAT = '%(asctime)s %(levelname)-7s %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """Format every record as one JSON object per line, for log collectors."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        # The summary logged at the end of every sync carries its metrics
+        if hasattr(record, 'sync'):
+            entry['sync'] = record.sync
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def configure_logging(level=logging.INFO, json_log=False):
+    """Send the sync's log to stdout, as text or JSON lines, showing `level` and above."""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if json_log else logging.Formatter(TEXT_FORMAT))
+    # Other libraries (googleapiclient logs every request at INFO) only get to report problems
+    logging.basicConfig(level=logging.WARNING, handlers=[handler], force=True)
+    logging.getLogger('src').setLevel(level)
@@ -1,12 +1,71 @@
 # get_calendar_service.py
 
+import json
 import pickle
 import os.path
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
+import threading
 
-def get_calendar_service():
+# The Google client libraries are imported where they are used: they take most of the startup time,
+# and the OAuth flow in particular is only needed the first time a user logs in
+# A local copy of the discovery document takes precedence over the one bundled with googleapiclient
+DISCOVERY_DOCUMENT_PATH = 'config/calendar.v3.json'
+
+# Loaded once per process and shared by every CalendarManager
+_discovery_document = None
+_credentials = None
+_credentials_lock = threading.Lock()
+# The Calendar API client isn't thread-safe, so each thread gets its own service
+_thread_data = threading.local()
+
+def get_calendar_service(creds=None):
+    # Credentials can be loaded once and shared by several services, e.g. one per thread
+    if creds is None:
+        creds = get_credentials()
+
+    # Proceed if creds are available
+    if creds:
+        cached = getattr(_thread_data, 'service', None)
+        if cached is not None and cached[0] is creds:
+            return cached[1]
+        try:
+            from googleapiclient.discovery import build_from_document
+            service = build_from_document(get_discovery_document(), credentials=creds)
+            _thread_data.service = (creds, service)
+            return service
+        except Exception as e:
+            print("Error building the service:", str(e))
+            return None
+    else:
+        return None
+
+def get_discovery_document():
+    # Build the service from a static document, so no discovery request is made at startup
+    global _discovery_document
+    if _discovery_document is None:
+        if os.path.exists(DISCOVERY_DOCUMENT_PATH):
+            with open(DISCOVERY_DOCUMENT_PATH, 'r', encoding='utf-8') as document:
+                _discovery_document = json.load(document)
+        else:
+            from googleapiclient.discovery_cache import get_static_doc
+            _discovery_document = json.loads(get_static_doc('calendar', 'v3'))
+    return _discovery_document
+
+def get_credentials():
+    # Load and refresh the credentials once, then hand out the same object
+    global _credentials
+    with _credentials_lock:
+        if _credentials is not None and not _credentials.valid:
+            from google.auth.transport.requests import Request
+            try:
+                _credentials.refresh(Request())
+            except Exception as e:
+                print("Refreshing token failed:", str(e))
+                _credentials = None
+        if _credentials is None:
+            _credentials = load_credentials()
+        return _credentials
+
+def load_credentials():
     creds = None
     SCOPES = ['https://www.googleapis.com/auth/calendar']
 
@@ -18,6 +77,7 @@ def get_calendar_service():
     # If credentials are not valid (expired, revoked, etc.), reauthenticate
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
+            from google.auth.transport.requests import Request
             try:
                 creds.refresh(Request())
             except Exception as e:
@@ -29,19 +89,11 @@ def get_calendar_service():
         else:
             creds = authenticate_user(SCOPES)
 
-    # Proceed if creds are available
-    if creds:
-        try:
-            service = build('calendar', 'v3', credentials=creds)
-            return service
-        except Exception as e:
-            print("Error building the service:", str(e))
-            return None
-    else:
-        return None
+    return creds
 
 def authenticate_user(SCOPES):
     try:
+        from google_auth_oauthlib.flow import InstalledAppFlow
         flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
         creds = flow.run_local_server(port=0)
         # Save the credentials for the next run
@@ -57,6 +109,9 @@ def authenticate_user(SCOPES):
 
 
 def logout():
+    global _credentials
+    _credentials = None
+    _thread_data.service = None
     if os.path.exists('token.pickle'):
         try:
             os.remove('token.pickle')
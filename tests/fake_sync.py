@@ -0,0 +1,64 @@
+# fake_sync.py
+"""
+    A test case base that syncs profiles against a fake Google Calendar, from a scratch working directory.
+"""
+
+import datetime
+import logging
+import os
+import tempfile
+import unittest
+from benchmarks.fake_calendar import FakeCalendarServer
+from src.configure_logging import configure_logging
+
+# The key of the synthetic one-event feed, which serve replaces
+CUSTOM_FEED_KEY = (1, False, 0)
+
+
+def vevent(uid, start, *extra):
+    """Return the content lines of a one-hour TimeEdit-style event starting at the naive UTC datetime start."""
+    return ['BEGIN:VEVENT', f'UID:{uid}', f'DTSTART:{start:%Y%m%dT%H%M%S}Z',
+            f'DTEND:{start + datetime.timedelta(hours=1):%Y%m%dT%H%M%S}Z',
+            f'SUMMARY:C{uid}. Course name: Course {uid}', *extra, 'END:VEVENT']
+
+
+class FakeSyncTestCase(unittest.TestCase):
+    """Starts a fake Calendar API and feed server per test, with a profile (self.config) that syncs from it.
+
+    Sync state, caches and color tables are written relative to the working directory, so each test runs in a
+    temporary directory of its own.
+    """
+
+    profile_name = 'test'
+    # Synthetic feed events, or None for a feed set with serve
+    feed_events = None
+
+    def setUp(self):
+        configure_logging(logging.CRITICAL)
+        self.server = FakeCalendarServer().start()
+        self.addCleanup(self.server.stop)
+        self.service = self.server.build_service()
+        events = self.feed_events if self.feed_events is not None else CUSTOM_FEED_KEY[0]
+        self.config = {
+            'config_name': self.profile_name,
+            'calendar_id': f'{self.profile_name}@example.com',
+            'ical_url': f"{self.server.url}feed.ics?events={events}&swedish=0&revision=0",
+            'time_zone': 'UTC',
+            'excluded_colors': '',
+        }
+        scratch = tempfile.TemporaryDirectory(prefix='timeeditarc-test-')
+        self.addCleanup(scratch.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(scratch.name)
+
+    def serve(self, events, etag):
+        """Serve a feed made of VEVENTs, each a list of content lines, with the given ETag."""
+        lines = ['BEGIN:VCALENDAR', 'VERSION:2.0']
+        for event in events:
+            lines += event
+        body = ('\r\n'.join(lines + ['END:VCALENDAR']) + '\r\n').encode('utf-8')
+        self.server.feeds[CUSTOM_FEED_KEY] = (body, etag)
+
+    def live_events(self, calendar_id=None):
+        calendar = self.server.store.calendars.get(calendar_id or self.config['calendar_id'], {})
+        return [event for event in calendar.values() if event['status'] != 'cancelled']
@@ -0,0 +1,81 @@
+# test_batch_writer.py
+"""
+    BatchWriter must tell the items of a batch apart: successes, permanent failures and failures worth retrying.
+
+    Run from the repository root: python -m unittest discover tests
+"""
+
+import json
+import unittest
+from googleapiclient.http import HttpMockSequence
+from benchmarks.fake_calendar import build_service
+from src.BatchWriter import BatchWriter
+from src.RequestExecutor import RequestExecutor
+
+BOUNDARY = 'batch_boundary'
+
+
+def batch_response(*parts):
+    """Return the HttpMockSequence entry of a batch response made of (request_id, status, headers, body) parts."""
+    content = ''
+    for request_id, status, headers, body in parts:
+        header_lines = ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+        content += (f'--{BOUNDARY}\r\nContent-Type: application/http\r\n'
+                    f'Content-ID: <response-batch + {request_id}>\r\n\r\n'
+                    f'HTTP/1.1 {status}\r\nContent-Type: application/json\r\n{header_lines}\r\n'
+                    f'{json.dumps(body)}\r\n')
+    content += f'--{BOUNDARY}--\r\n'
+    return {'status': '200', 'content-type': f'multipart/mixed; boundary={BOUNDARY}'}, content
+
+
+def error(code, message):
+    return {'error': {'code': code, 'message': message, 'errors': [{'reason': message}]}}
+
+
+class BatchWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        # Nothing is sent to the service's own connection, every batch goes to the writer's HttpMockSequence
+        self.service = build_service('http://calendar.invalid/')
+
+    def insert(self, summary):
+        return self.service.events().insert(calendarId='primary', body={'summary': summary})
+
+    def test_items_succeed_fail_and_retry(self):
+        http = HttpMockSequence([
+            batch_response(('0', '200 OK', {}, {'id': 'event0'}),
+                           ('1', '400 Bad Request', {}, error(400, 'invalid')),
+                           ('2', '503 Service Unavailable', {'Retry-After': '0'}, error(503, 'backendError'))),
+            # Only the item that failed with a retryable error is sent again, alone
+            batch_response(('0', '200 OK', {}, {'id': 'event2'})),
+        ])
+        writer = BatchWriter(self.service, batch_size=3, executor=RequestExecutor(), http=http)
+        created = []
+        for number in range(3):
+            writer.add(self.insert(f'Event {number}'), f'Event {number}',
+                       on_success=lambda response: created.append(response['id']))
+        writer.flush()
+
+        self.assertEqual(len(http.request_sequence), 2)
+        self.assertEqual(created, ['event0', 'event2'])
+        self.assertEqual(writer.succeeded, 2)
+        self.assertEqual([label for label, _ in writer.failed], ['Event 1'])
+        self.assertEqual(writer.retryable, [])
+        self.assertEqual(writer.summary(), "2 succeeded, 1 failed, 0 failed with retryable errors")
+        self.assertEqual(writer.executor.metrics.counters['api_retries'], 1)
+
+    def test_retryable_failure_gives_up(self):
+        http = HttpMockSequence([
+            batch_response(('0', '503 Service Unavailable', {'Retry-After': '0'}, error(503, 'backendError')))
+            for _ in range(2)])
+        writer = BatchWriter(self.service, batch_size=1, executor=RequestExecutor(max_retries=1), http=http)
+        writer.add(self.insert('Event'), 'Event')
+        writer.flush()
+
+        self.assertEqual(len(http.request_sequence), 2)
+        self.assertEqual(writer.succeeded, 0)
+        self.assertEqual([label for label, _ in writer.retryable], ['Event'])
+
+
+if __name__ == '__main__':
+    unittest.main()
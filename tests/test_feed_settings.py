@@ -0,0 +1,40 @@
+# test_feed_settings.py
+"""
+    A feed that hasn't changed must be synced again when the profile's settings have.
+
+    Run from the repository root: python -m unittest discover tests
+"""
+
+import datetime
+import unittest
+from fake_sync import FakeSyncTestCase, vevent
+from src.SyncRunner import SyncRunner
+
+
+class FeedSettingsTest(FakeSyncTestCase):
+    profile_name = 'feed-settings'
+
+    def check_excluded_color_resyncs(self, stream):
+        start = datetime.datetime.utcnow().replace(microsecond=0) + datetime.timedelta(days=2)
+        self.serve([vevent('1', start)], '"settings"')
+        result = SyncRunner(stream=stream).sync_profile(self.config, self.service)
+        self.assertEqual(result['status'], 'synced')
+        color = self.live_events()[0]['colorId']
+        self.assertEqual(SyncRunner(stream=stream).sync_profile(self.config, self.service)['status'], 'unchanged')
+
+        # The same feed, with the event's color excluded
+        self.config['excluded_colors'] = color
+        result = SyncRunner(stream=stream).sync_profile(self.config, self.service)
+        self.assertEqual(result['status'], 'synced')
+        self.assertNotEqual(self.live_events()[0]['colorId'], color)
+        self.assertEqual(SyncRunner(stream=stream).sync_profile(self.config, self.service)['status'], 'unchanged')
+
+    def test_excluded_color_resyncs(self):
+        self.check_excluded_color_resyncs(stream=False)
+
+    def test_excluded_color_resyncs_streamed(self):
+        self.check_excluded_color_resyncs(stream=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
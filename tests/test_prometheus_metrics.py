@@ -0,0 +1,33 @@
+# test_prometheus_metrics.py
+"""
+    Separate runs writing Prometheus metrics to the same place must keep every profile's metrics.
+
+    Run from the repository root: python -m unittest discover tests
+"""
+
+import os
+import unittest
+from fake_sync import FakeSyncTestCase
+from src.SyncRunner import SyncRunner
+
+
+class PrometheusMetricsTest(FakeSyncTestCase):
+    profile_name = 'prometheus'
+    feed_events = 2
+
+    def test_each_profile_has_its_own_file(self):
+        # One run per profile, as separate cron jobs would
+        for name in ('first', 'second'):
+            result = SyncRunner(prometheus_out='timeeditarc.prom').sync_profile(
+                dict(self.config, config_name=name), self.service)
+            self.assertEqual(result['status'], 'synced')
+
+        self.assertFalse(os.path.exists('timeeditarc.prom'))
+        for name in ('first', 'second'):
+            with open(f'timeeditarc_{name}.prom', encoding='utf-8') as metrics_file:
+                metrics = metrics_file.read()
+            self.assertIn(f'timeeditarc_last_sync_success{{profile="{name}"}} 1', metrics)
+
+
+if __name__ == '__main__':
+    unittest.main()
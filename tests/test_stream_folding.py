@@ -0,0 +1,52 @@
+# test_stream_folding.py
+"""
+    A streamed feed must unfold its lines the same wherever the downloaded chunks happen to end.
+
+    Run from the repository root: python -m unittest discover tests
+"""
+
+import datetime
+import unittest
+import requests
+from fake_sync import FakeSyncTestCase, vevent
+from src.SyncRunner import SyncRunner
+
+
+class CarriageReturnChunkSession:
+    """A requests session whose streamed responses arrive in chunks that end between every CR and LF."""
+
+    def get(self, url, **kwargs):
+        response = requests.get(url, timeout=kwargs.pop('timeout', 10), **kwargs)
+        iter_content = response.iter_content
+
+        def split_chunks(*args, **kw):
+            for chunk in iter_content(*args, **kw):
+                pieces = chunk.split(b'\r')
+                for piece in pieces[:-1]:
+                    yield piece + b'\r'
+                if pieces[-1]:
+                    yield pieces[-1]
+
+        response.iter_content = split_chunks
+        return response
+
+
+class StreamFoldingTest(FakeSyncTestCase):
+    profile_name = 'stream-folding'
+
+    def test_folded_line_split_at_chunk_boundary(self):
+        start = datetime.datetime.utcnow().replace(microsecond=0) + datetime.timedelta(days=2)
+        event = vevent('1', start)
+        # The course name is folded onto a second line
+        event[4:5] = ['SUMMARY:C1. Course name: Introduction to', '  Folded Lines']
+        self.serve([event], '"folded"')
+        result = SyncRunner(stream=True).sync_profile(self.config, self.service,
+                                                      session=CarriageReturnChunkSession())
+        self.assertEqual(result['status'], 'synced')
+        events = self.live_events()
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]['summary'], 'Introduction to Folded Lines - C1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+# test_stream_reconcile.py
+"""
+    A streamed sync whose feed is cut off must fail instead of deleting the events it never read.
+
+    Run from the repository root: python -m unittest discover tests
+"""
+
+import unittest
+import requests
+from fake_sync import FakeSyncTestCase
+from src.SyncRunner import SyncRunner
+
+
+class TruncatingSession:
+    """A requests session whose streamed responses break off after a number of lines."""
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def get(self, url, **kwargs):
+        response = requests.get(url, timeout=kwargs.pop('timeout', 10), **kwargs)
+        iter_lines = response.iter_lines
+
+        def truncated_lines(*args, **kw):
+            for number, line in enumerate(iter_lines(*args, **kw)):
+                if number == self.lines:
+                    raise requests.exceptions.ChunkedEncodingError("Connection reset by peer")
+                yield line
+
+        response.iter_lines = truncated_lines
+        return response
+
+
+class StreamReconcileTest(FakeSyncTestCase):
+    profile_name = 'stream-reconcile'
+    feed_events = 10
+
+    def test_truncated_stream_deletes_nothing(self):
+        result = SyncRunner(stream=True, reconcile=True).sync_profile(self.config, self.service)
+        self.assertEqual(result['status'], 'synced')
+        self.assertEqual(len(self.live_events()), 10)
+
+        # A new revision of the feed, so it is downloaded again, cut off in the middle of its third event
+        self.config['ical_url'] = self.config['ical_url'].replace('revision=0', 'revision=1')
+        result = SyncRunner(stream=True, reconcile=True).sync_profile(
+            self.config, self.service, session=TruncatingSession(30))
+        self.assertEqual(result['status'], 'failed')
+        self.assertIn('0 delete', result['plan'])
+        self.assertEqual(len(self.live_events()), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+# test_sync_state.py
+"""
+    The sync state must only take events for synced when they were synced to the profile's current calendar.
+
+    Run from the repository root: python -m unittest discover tests
+"""
+
+import datetime
+import sqlite3
+import unittest
+from fake_sync import FakeSyncTestCase, vevent
+from src.SyncRunner import SyncRunner
+from src.SyncStateManager import SyncStateManager
+
+
+class SyncStateTest(FakeSyncTestCase):
+    profile_name = 'sync-state'
+
+    def test_changed_calendar_is_synced_in_full(self):
+        start = datetime.datetime.utcnow().replace(microsecond=0) + datetime.timedelta(days=2)
+        self.serve([vevent('1', start), vevent('2', start + datetime.timedelta(days=1))], '"state"')
+        result = SyncRunner(prefetch=False).sync_profile(self.config, self.service)
+        self.assertEqual(result['status'], 'synced')
+        old_calendar = self.config['calendar_id']
+        self.assertEqual(len(self.live_events(old_calendar)), 2)
+
+        # Without prefetching there is no index of the new calendar to check the sync state against
+        self.config['calendar_id'] = 'moved@example.com'
+        result = SyncRunner(prefetch=False, force=True).sync_profile(self.config, self.service)
+        self.assertEqual(result['status'], 'synced')
+        self.assertIn('2 create', result['plan'])
+        self.assertEqual(len(self.live_events()), 2)
+        self.assertEqual(len(self.live_events(old_calendar)), 2)
+
+    def test_state_without_calendars_is_dropped(self):
+        state = SyncStateManager(self.profile_name)
+        state.close()
+        with sqlite3.connect(state.path) as connection:
+            connection.execute("DROP TABLE synced_events")
+            connection.execute("CREATE TABLE synced_events (uid TEXT PRIMARY KEY, event_id TEXT NOT NULL, "
+                               "content_hash TEXT NOT NULL, last_synced TEXT NOT NULL)")
+            connection.execute("INSERT INTO synced_events VALUES ('1', 'event1', 'hash', '')")
+        connection.close()
+
+        state = SyncStateManager(self.profile_name)
+        self.addCleanup(state.close)
+        self.assertIsNone(state.get(self.config['calendar_id'], '1'))
+        state.put(self.config['calendar_id'], '1', 'event1', 'hash')
+        self.assertEqual(state.get(self.config['calendar_id'], '1'), ('event1', 'hash'))
+        self.assertIsNone(state.get('other@example.com', '1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
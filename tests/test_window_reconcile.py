@@ -0,0 +1,41 @@
+# test_window_reconcile.py
+"""
+    Reconciling with a sync window must not delete the events outside it, even when a recurring event that
+    started long before the window is in the feed.
+
+    Run from the repository root: python -m unittest discover tests
+"""
+
+import datetime
+import unittest
+from fake_sync import FakeSyncTestCase, vevent
+from src.SyncRunner import SyncRunner
+
+
+class WindowReconcileTest(FakeSyncTestCase):
+    profile_name = 'window-reconcile'
+
+    def test_window_limits_deletions(self):
+        today = datetime.datetime.now(datetime.timezone.utc).replace(hour=10, minute=0, second=0, microsecond=0,
+                                                                     tzinfo=None)
+        past = [vevent(f'past{day}', today - datetime.timedelta(days=10 + day)) for day in range(5)]
+        series = vevent('series', datetime.datetime(2024, 1, 1, 12), 'RRULE:FREQ=WEEKLY;COUNT=30')
+        future = [vevent(f'future{day}', today + datetime.timedelta(days=5 + day)) for day in range(2)]
+        self.serve(past + [series] + future, '"1"')
+        result = SyncRunner(reconcile=True).sync_profile(self.config, self.service)
+        self.assertIn('8 create', result['plan'])
+
+        # The past events are outside the window, so they are neither synced nor deleted
+        result = SyncRunner(reconcile=True, sync_from='yesterday').sync_profile(self.config, self.service)
+        self.assertIn('0 delete', result['plan'])
+        self.assertEqual(len(self.live_events()), 8)
+
+        # An event inside the window that left the feed is still deleted
+        self.serve(past + [series] + future[1:], '"2"')
+        result = SyncRunner(reconcile=True, sync_from='yesterday').sync_profile(self.config, self.service)
+        self.assertIn('1 delete', result['plan'])
+        self.assertEqual(len(self.live_events()), 7)
+
+
+if __name__ == '__main__':
+    unittest.main()